@@ -1,31 +1,40 @@
 import cmd
 import hashlib
+import heapq
 import json
 import os
+import re
 import shutil
 import subprocess
 import sys
+import threading
 import webbrowser
+from contextlib import nullcontext
 from datetime import date, datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Any, Tuple, TYPE_CHECKING
 
 import psutil
 from colorama import init, Fore
 from tabulate import tabulate
 
 from etc.pepes import *
+from etc.table import StreamingTable
 from etc.utils import truncate_filename, AutoCompletion, is_integer, playsound_deferred, FuzzyMatcher, \
     get_latest_existing_path
 from services import youtube, anime, file_system, com, processes, web_searcher, local_searcher, \
-    history_manager, cache_directory
+    history_manager, cache_directory, http_client, cache_store, cache_manager, startup_timer, write_behind, profiler
 from services.cursive.display import TextPane
 from services.cursive.input import ListMenu, SliderMenu, InputMenu
 from services.inet import Server
 from services.internal import SerializedEncoder, CommandArgsParser
+from services.internal.aliases import AliasManager
 from services.internal.config import Config
-from services.osys import AudioService
-from services.osys.fs import File
-from services.osys.info import display_sysinfo
+from services.internal.lazy import is_loaded, resolve
+
+# (the services behind these are loaded on first use, importing them here would load them at startup)
+if TYPE_CHECKING:
+    from services.osys.fs import File
+    from services.search.content import ContentQuery
 
 intro_logo: Final[str] = Fore.GREEN + r"""
                                                       ⠀⠀       ⠀⠀⠀  ⣀⣤⡤⠀⠀⠀
@@ -45,6 +54,36 @@ o888o  o888o          `Y8bood8P'  o888ooooood8 o888o⠀⠀          ⠀⡆⠀⠀
 
 
 class RiosCLI(cmd.Cmd):
+    FILE_SORT_KEYS: Final[Dict[str, Callable[["File"], Any]]] = {
+        "name": lambda file: file.name.lower(),
+        "size": lambda file: -file.size_mb,  # biggest first
+        "mtime": lambda file: -file.last_updated,  # newest first
+    }
+    # option -> if it takes a value
+    SEARCH_OPTIONS: Final[Dict[str, bool]] = {
+        "top": True,
+        "content": True,
+        "types": True,
+        "regex": False,
+        "ignore-case": False,
+    }
+
+    # the caches a command needs to be loaded before it runs (they load in the background, see preloop), commands that
+    # aren't listed don't wait for anything
+    COMMAND_CACHES: Final[Dict[str, List[str]]] = {
+        "cd": ["ls.listings"],
+        "ls": ["ls.*"],
+        "copy": ["ls.listings"],
+        "move": ["ls.listings"],
+        "zip": ["ls.listings"],
+        "unzip": ["ls.listings"],
+        "hash": ["ls.hashes"],
+        "search": ["search.*", "ls.*"],
+        "anime": ["anime", "ls.listings"],
+        "_history": ["history"],
+        "_cache": ["*"],
+    }
+
     prompt: str = Fore.WHITE + "~$ "
     nohelp: str = f"*** %s? What's that? -- I wonder who forgot to write documentation about this command... {Fore.WHITE}*ahem*{Fore.RESET}"
     intro: Final[str] = f"{intro_logo}\nHello master, what can I do for you?"
@@ -54,9 +93,12 @@ class RiosCLI(cmd.Cmd):
 
         # init stuff
         init(autoreset=True)
+        # (a lambda, so the file system only gets loaded once something is completed)
+        AutoCompletion.directory_lister = lambda directory: file_system.get_directories_in_directory(directory)
 
         # cli setup
         self.clear_command: Final[str] = "cls"
+        self.aliases: Optional[AliasManager] = None
         self.alias_map: Dict[str, List[str]] = {}
         self.config: Optional[Config] = None
         self.existing_commands: Final[List[str]] = [name.removeprefix("do_") for name in self.get_names() if
@@ -91,32 +133,48 @@ class RiosCLI(cmd.Cmd):
     def __on_error(self, error_exception: Exception):
         print(f"{Fore.RED}[!] An error has occurred: {error_exception}")
 
-    def list_files(self, files: List[File], display_file_hashes: bool = True):
+    def list_files(self, files: List["File"], display_file_hashes: bool = True, sort_by: Optional[str] = None,
+                   limit: Optional[int] = None, page: int = 1):
         print()
         print(f"{Fore.GREEN}Files ({len(files)}):")
 
         if not files:
             return
 
-        table_data = []
+        # only sort/keep what's actually going to be displayed
+        shown_files = files
+        offset = (page - 1) * limit if limit else 0
+        if sort_by:
+            sort_key = self.FILE_SORT_KEYS[sort_by]
+            if limit:
+                shown_files = heapq.nsmallest(offset + limit, files, key=sort_key)[offset:]
+            else:
+                shown_files = sorted(files, key=sort_key)
+        elif limit:
+            shown_files = files[offset:offset + limit]
+
+        if limit:
+            print(f"{Fore.LIGHTBLACK_EX}Page {page} (showing {len(shown_files)} of {len(files)})")
+
         max_length = 32
 
-        for file in files:
-            base_name, file_ext = os.path.splitext(file.name)
+        def rows():
+            for file in shown_files:
+                base_name, file_ext = os.path.splitext(file.name)
 
-            truncated_name = truncate_filename(base_name, file_ext, max_length)
-            filename_display = f"{Fore.LIGHTBLACK_EX}{truncated_name}{Fore.RESET}" \
-                if file.name.startswith(".") else truncated_name
-            file_size_mb_rounded = float(f"{file.size_mb:.2f}")
-            file_size_display = f"{Fore.CYAN}{file_size_mb_rounded} MB" if file_size_mb_rounded > 0 else f"{Fore.CYAN}~{file_size_mb_rounded} MB"
-            file_type = file_system.get_file_type(file_ext, fallback=f"{Fore.LIGHTBLACK_EX}<None>{Fore.RESET}")
-            last_updated = datetime.fromtimestamp(file.last_updated).strftime("%Y-%m-%d %H:%M:%S").split()
-            last_updated = f"{last_updated[0]} {Fore.LIGHTBLACK_EX}{last_updated[1]}{Fore.RESET}"
+                truncated_name = truncate_filename(base_name, file_ext, max_length)
+                filename_display = f"{Fore.LIGHTBLACK_EX}{truncated_name}{Fore.RESET}" \
+                    if file.name.startswith(".") else truncated_name
+                file_size_mb_rounded = float(f"{file.size_mb:.2f}")
+                file_size_display = f"{Fore.CYAN}{file_size_mb_rounded} MB" if file_size_mb_rounded > 0 else f"{Fore.CYAN}~{file_size_mb_rounded} MB"
+                file_type = file_system.get_file_type(file_ext, fallback=f"{Fore.LIGHTBLACK_EX}<None>{Fore.RESET}")
+                last_updated = datetime.fromtimestamp(file.last_updated).strftime("%Y-%m-%d %H:%M:%S").split()
+                last_updated = f"{last_updated[0]} {Fore.LIGHTBLACK_EX}{last_updated[1]}{Fore.RESET}"
 
-            cell_data = [filename_display, file_size_display, file_type, last_updated]
-            if display_file_hashes:
-                cell_data.append(file.file_hash)
-            table_data.append(cell_data)
+                cell_data = [filename_display, file_size_display, file_type, last_updated]
+                if display_file_hashes:
+                    cell_data.append(file.file_hash)
+                yield cell_data
 
         headers = [f"{Fore.WHITE}Filename", "Size", "Type", f"Updated{Fore.RESET}"]
         colalign = ("left", "right", "left", "left")
@@ -124,11 +182,7 @@ class RiosCLI(cmd.Cmd):
             headers = [f"{Fore.WHITE}Filename", "Size", "Type", "Updated", f"Hash{Fore.RESET}"]
             colalign = ("left", "right", "left", "left", "right")
 
-        print(tabulate(
-            table_data,
-            headers=headers,
-            colalign=colalign
-        ))
+        StreamingTable(headers, colalign=colalign).print(rows())
 
     def list_directories(self, directories: List[str]):
         print()
@@ -142,12 +196,34 @@ class RiosCLI(cmd.Cmd):
             print(f"{Fore.LIGHTBLACK_EX}Command ignored.")
             return ""
 
+        self.__wait_for_caches(line)
         return line
 
+    def __wait_for_caches(self, line: str):
+        command, _, _ = self.parseline(line)
+        if not command:
+            return
+
+        if command not in self.existing_commands:
+            # might be an alias, can't tell until the aliases are loaded
+            cache_manager.wait_for("aliases")
+            command = next((_command for _command, aliases in self.alias_map.items() if command in aliases), command)
+
+        patterns = self.COMMAND_CACHES.get(command)
+        if patterns:
+            cache_manager.wait_for(*patterns)
+
+    def onecmd(self, line):
+        command, _, _ = self.parseline(line)
+        # the caches don't get saved in the background while a command is using them
+        with profiler.command(command) if command else nullcontext(), write_behind.paused():
+            return super().onecmd(line)
+
     def postcmd(self, stop, line):
         if line.strip() != "":
             print()  # add empty line for better readability
             history_manager.record_line(line)
+            write_behind.schedule()
 
         return stop
 
@@ -161,49 +237,40 @@ class RiosCLI(cmd.Cmd):
             self.config.create_default_config()
 
         # create alias map
-        alias_map_file = os.path.join(config_dir, "alias.map")
-        if not os.path.exists(alias_map_file):
-            file_system.abs_create_file(alias_map_file)
+        self.aliases = AliasManager(config_dir)
+        self.alias_map = self.aliases.alias_map
+        if not os.path.exists(self.aliases.alias_file):
+            file_system.abs_create_file(self.aliases.alias_file)
+        cache_manager.register("aliases", self.aliases)
 
     def preloop(self):
-        file_system.load()
-        local_searcher.load()
-        web_searcher.load()
-        anime.lookup.load()
-        history_manager.load()
-
-        # TODO: move this
-        # load alias map
-        try:
-            import pickle  # (LC) + TEMP!!
-            with open(file=os.path.join(self.script_wd, ".config", "alias.map"), mode="rb") as f:
-                am_data = pickle.load(f)
-                self.alias_map = am_data.get("alias_map", {})
-        except:
-            pass
+        # the prompt doesn't wait for the caches, commands wait for the ones they need (see precmd)
+        cache_manager.load_all_in_background()
+        self.aliases.add_commands(self.existing_commands)
+        # whatever changes gets saved shortly after, postloop only has to save what changed since
+        write_behind.start()
 
-        for command in self.existing_commands:
-            if command not in self.alias_map.keys():
-                self.alias_map[command] = []
+        # most commands end up using the file system, get it (and its caches) ready in the meantime
+        threading.Thread(target=resolve, args=(file_system,), name="warm-up", daemon=True).start()
 
     def postloop(self):
-        # TODO: move this
-        # save alias map
-        try:
-            import pickle  # TEMP!!
-            with open(file=os.path.join(self.script_wd, ".config", "alias.map"), mode="wb") as f:
-                pickle.dump({"alias_map": self.alias_map}, f)
-        except:
-            pass
-
-        file_system.save()
-        local_searcher.save()
-        web_searcher.save()
-        anime.lookup.save()
-        history_manager.save()
+        with profiler.stage("postloop"):
+            with profiler.stage("postloop.write_behind"):
+                write_behind.stop()
+            with profiler.stage("postloop.save"):
+                cache_manager.save_all()
+            if is_loaded(http_client):
+                http_client.close()
+            if is_loaded(local_searcher):
+                local_searcher.content_scanner.close()
+
+        # don't lose what was captured
+        if profiler.is_capturing:
+            profiler.dump(profiler.stop_capture(self.__profile_sections()))
 
     def cmdloop(self, intro=None):
-        self.preloop()
+        with startup_timer.stage("preloop"):
+            self.preloop()
         if self.use_rawinput and self.completekey:
             try:
                 import readline
@@ -217,6 +284,7 @@ class RiosCLI(cmd.Cmd):
                 self.intro = intro
             if self.intro:
                 self.stdout.write(str(self.intro) + "\n")
+            startup_timer.mark_prompt()
             stop = None
             while not stop:
                 try:
@@ -415,7 +483,7 @@ class RiosCLI(cmd.Cmd):
             raise
 
     def do_ls(self, line):
-        """Lists the files and directories in a directory. Options: [--cache, --chashes, --file(s), --dir(s), --match <QUERY>]"""
+        """Lists the files and directories in a directory. Options: [--cache, --chashes, --file(s), --dir(s), --match <QUERY>, --sort <name/size/mtime>, --limit <N>, --page <N>]"""
         try:
             directory = file_system.clean_path(line, filter_args=True)
             is_zip_file = os.path.isfile(directory) and os.path.splitext(directory)[1] == ".zip"
@@ -431,6 +499,27 @@ class RiosCLI(cmd.Cmd):
 
             use_cache = parser.is_arg_present("cache")
             calculate_hashes = parser.is_arg_present("chashes")
+            if calculate_hashes:
+                # 0 (or less) lets the pool decide based on the amount of cores
+                hash_workers = self.config.config.getint(section="DEFAULT", option="hash_workers", fallback=0)
+                file_system.hasher.max_workers = hash_workers if hash_workers > 0 else None
+                file_system.hasher.use_processes = self.config.config.getboolean(section="DEFAULT",
+                                                                                 option="hash_with_processes",
+                                                                                 fallback=False)
+
+            sort_by = parser.get_value_of_arg("sort")
+            if sort_by is not None and sort_by not in self.FILE_SORT_KEYS:
+                print(f"{Fore.RED}Can only sort by: {', '.join(self.FILE_SORT_KEYS.keys())}")
+                return
+
+            limit = parser.get_value_of_arg("limit")
+            page = parser.get_value_of_arg("page") or "1"
+            if (limit is not None and not (is_integer(limit) and int(limit) > 0)) or \
+                    not (is_integer(page) and int(page) > 0):
+                print(f"{Fore.RED}Both '--limit' and '--page' require a number above 0.")
+                return
+            limit = int(limit) if limit is not None else None
+            page = int(page)
 
             perform_matching = parser.is_arg_present("match")
             match_query = parser.get_value_of_arg("match")
@@ -447,19 +536,18 @@ class RiosCLI(cmd.Cmd):
                     self.list_files(zip_content.get("files"), display_file_hashes=False)
                 return
 
-            # normal directories
+            # normal directories (scanned once, even when both files and dirs get printed)
+            files, directories = file_system.scan_directory(directory, use_cache, calculate_hashes)
             if print_dirs:
-                directories = file_system.get_directories_in_directory(directory, use_cache)
                 if perform_matching and match_query:
                     directories = AutoCompletion.matches_of(directories, match_query,
                                                             completion_mode=AutoCompletion.MODE_MATCH_ANY)
                 self.list_directories(directories)
             if print_files:
-                files = file_system.get_files_in_directory(directory, use_cache, calculate_hashes)
                 if perform_matching and match_query:
                     files = AutoCompletion.matches_of(files, match_query,
                                                       completion_mode=AutoCompletion.MODE_MATCH_ANY)
-                self.list_files(files, display_file_hashes=calculate_hashes)
+                self.list_files(files, display_file_hashes=calculate_hashes, sort_by=sort_by, limit=limit, page=page)
         except Exception as e:
             self.__on_error(e)
 
@@ -471,7 +559,8 @@ class RiosCLI(cmd.Cmd):
             AutoCompletion.TYPE_DIRECTORIES_AND_ZIP
         )
         arg_matches = AutoCompletion.matches_of(
-            ["--cache", "--chashes", "--file", "--files", "--dir", "--dirs", "--match <query>"],
+            ["--cache", "--chashes", "--file", "--files", "--dir", "--dirs", "--match <query>", "--sort <name/size/mtime>",
+             "--limit <N>", "--page <N>"],
             text
         )
 
@@ -894,6 +983,8 @@ class RiosCLI(cmd.Cmd):
 
     def do_volume(self, line):
         """Adjusts volume for windows."""
+        from services.osys import AudioService
+
         if not line:
             new_volume_level = SliderMenu.spawn("Volume", increment_level=2, initial_value=AudioService.get_volume())
         else:
@@ -930,6 +1021,7 @@ class RiosCLI(cmd.Cmd):
 
     def do_sysinfo(self, _):
         """Device statistics."""
+        from services.osys.info import display_sysinfo
         display_sysinfo()
 
     def do_netstat(self, _):
@@ -978,8 +1070,28 @@ class RiosCLI(cmd.Cmd):
             self.default(subcommand)
 
     def do_search(self, query):
-        """Searches a specified place for something to match the given query."""
-        query = query.strip()
+        """Searches a specified place for something to match the given query. Options: [--top <N>] (local only), [--content <PATTERN>, --regex, --ignore-case, --types <.ext,.ext>] (local file contents)"""
+        query, options = self.__parse_search_options(query)
+
+        top_k = options.get("top")
+        if "top" in options:
+            if not (top_k is not None and is_integer(top_k) and int(top_k) > 0):
+                print(f"{Fore.RED}'--top' requires a number above 0.")
+                return
+            top_k = int(top_k)
+
+        if "content" in options:
+            # the pattern is whatever follows '--content', or else the rest of the query
+            pattern = options["content"] or query
+            if not pattern:
+                print(f"{Fore.RED}'--content' requires a pattern.")
+                return
+            from services.search.content import ContentQuery
+            self.__search_content(ContentQuery(pattern, is_regex="regex" in options,
+                                               ignore_case="ignore-case" in options),
+                                  file_types=(options.get("types") or "").replace(",", " "))
+            return
+
         search_type = ListMenu.spawn(["Web", "Locally"], "Where do you want to search?")
         if not search_type:
             return
@@ -987,31 +1099,151 @@ class RiosCLI(cmd.Cmd):
         search_type = search_type.lower()
         if search_type == "web":
             print(f"{Fore.LIGHTBLACK_EX}Searching the web for: '{query}'...")
+            self.__configure_web_searcher()
             results = web_searcher.search(query)
+
+            result = ListMenu.spawn([r.title for r in results], f"Search results ({len(results)})")
+            selected_result = next((r for r in results if r.title == result), None)
+            if selected_result:
+                webbrowser.open(selected_result.location, new=0, autoraise=True)
         elif search_type == "locally":
-            home_dir = os.path.expanduser("~/Desktop")
-            root = InputMenu.spawn("Path: ",
-                                   title=f"Choose a starting directory to perform the search in (Default={home_dir})")
-            if not root:
-                root = home_dir
-
-            print(f"{Fore.LIGHTBLACK_EX}Searching locally for: '{query}'...")
-            local_searcher.search_threshold = self.config.config.getint(section="DEFAULT", option="search_threshold")
-            results = local_searcher.search(directories=[root], fn_query=query)
+            root = self.__ask_search_root()
+
+            search_threshold = self.config.config.getint(section="DEFAULT", option="search_threshold")
+            self.__configure_local_searcher()
+
+            if top_k is not None:
+                # only the best matches, already ranked
+                results = local_searcher.search(directories=[root], fn_query=query,
+                                                search_threshold=search_threshold, top_k=top_k)
+                result = ListMenu.spawn([f"{r.ranking}. {r.title}" for r in results],
+                                        f"Top {len(results)} search results")
+                selected_result = next((r for r in results if f"{r.ranking}. {r.title}" == result), None)
+                if selected_result:
+                    self.do_open(selected_result.location)
+                return
+
+            # results show up (and get re-ranked) while the search is still running, quitting the menu stops it
+            stop_event = threading.Event()
+            results = local_searcher.search_iter(directories=[root], fn_query=query,
+                                                 search_threshold=search_threshold, stop_event=stop_event)
+            selected_result = ListMenu.spawn_live(results, "Search results", sort_key=lambda r: -r.score,
+                                                  on_close=stop_event.set)
+            if selected_result:
+                self.do_open(selected_result.location)
         else:
             self.default(query)
-            return
 
-        result = ListMenu.spawn([r.title for r in results], f"Search results ({len(results)})")
-        selected_result = next((r for r in results if r.title == result), None)
-        if not selected_result:
-            return
+    def __parse_search_options(self, line: str) -> Tuple[str, Dict[str, Optional[str]]]:
+        """
+        Splits the search options from the query. Options are only picked up with their prefix, option names are
+        never taken as the value of another option.
 
-        if search_type == "web":
-            webbrowser.open(selected_result.location, new=0, autoraise=True)
-        else:
+        :param line: The arguments of the search command.
+        :return: The query (what's left of the line) and the options, options without a value map to None.
+        """
+        def is_option(token: str) -> bool:
+            return token.startswith("--") and token.removeprefix("--") in self.SEARCH_OPTIONS
+
+        tokens = list(re.finditer(r"\S+", line))
+        options: Dict[str, Optional[str]] = {}
+        option_spans = []
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            index += 1
+            if not is_option(token.group()):
+                continue
+
+            option = token.group().removeprefix("--")
+            start, end = token.span()
+            if option == "content":
+                # the pattern is taken as typed (whitespace included), up to the next option
+                while index < len(tokens) and not is_option(tokens[index].group()):
+                    index += 1
+                pattern_end = tokens[index].start() if index < len(tokens) else len(line)
+                options[option] = line[end:pattern_end].strip() or None
+                end = pattern_end
+            elif self.SEARCH_OPTIONS[option] and index < len(tokens) and not is_option(tokens[index].group()):
+                options[option] = tokens[index].group()
+                end = tokens[index].end()
+                index += 1
+            else:
+                options[option] = None
+            option_spans.append((start, end))
+
+        parts = []
+        previous_end = 0
+        for start, end in option_spans:
+            parts.append(line[previous_end:start].strip())
+            previous_end = end
+        parts.append(line[previous_end:].strip())
+        return " ".join(part for part in parts if part), options
+
+    def complete_search(self, text, line, begidx, endidx):
+        del line, begidx, endidx
+        return AutoCompletion.matches_of(
+            ["--top <N>", "--content <pattern>", "--regex", "--ignore-case", "--types <.ext,.ext>"],
+            text
+        )
+
+    def __search_content(self, query: "ContentQuery", file_types: str):
+        root = self.__ask_search_root()
+        if query.is_regex:
+            try:
+                query.compile()
+            except re.error as e:
+                print(f"{Fore.RED}Invalid pattern: {e}")
+                return
+
+        self.__configure_local_searcher()
+        workers = self.config.config.getint(section="DEFAULT", option="content_search_workers", fallback=0)
+        max_file_size_mb = self.config.config.getint(section="DEFAULT", option="content_search_max_file_size_mb",
+                                                     fallback=50)
+        local_searcher.content_scanner.max_workers = workers if workers > 0 else None
+        # 'auto' leaves it up to the size of the scan
+        with_processes = self.config.config.get(section="DEFAULT", option="content_search_with_processes",
+                                                fallback="auto")
+        local_searcher.content_scanner.use_processes = None if with_processes.strip().lower() == "auto" else \
+            self.config.config.getboolean(section="DEFAULT", option="content_search_with_processes")
+
+        # matching lines show up while the files are still being scanned, quitting the menu stops the scan
+        stop_event = threading.Event()
+        results = local_searcher.search_content(directories=[root], query=query, file_types=file_types,
+                                                max_file_size=max_file_size_mb * 1024 * 1024 if max_file_size_mb > 0
+                                                else None,
+                                                stop_event=stop_event)
+        selected_result = ListMenu.spawn_live(results, "Content search results", on_close=stop_event.set)
+        if selected_result:
             self.do_open(selected_result.location)
 
+    def __ask_search_root(self) -> str:
+        home_dir = os.path.expanduser("~/Desktop")
+        root = InputMenu.spawn("Path: ",
+                               title=f"Choose a starting directory to perform the search in (Default={home_dir})")
+        return root or home_dir
+
+    def __configure_web_searcher(self):
+        engines = self.config.config.get(section="DEFAULT", option="web_search_engines", fallback="")
+        web_searcher.enabled = set(engines.lower().split()) or {engine.name for engine in web_searcher.engines}
+        web_searcher.deadline = self.config.config.getfloat(section="DEFAULT", option="web_search_deadline",
+                                                            fallback=3.0)
+
+    def __configure_local_searcher(self):
+        # 0 (or less) means unlimited/automatic for all of these
+        workers = self.config.config.getint(section="DEFAULT", option="search_workers", fallback=0)
+        max_depth = self.config.config.getint(section="DEFAULT", option="search_max_depth", fallback=-1)
+        max_results = self.config.config.getint(section="DEFAULT", option="search_max_results", fallback=0)
+        exclude = self.config.config.get(section="DEFAULT", option="search_exclude", fallback="")
+
+        from services.search.walker import ParallelWalker
+        local_searcher.walker = ParallelWalker(
+            max_workers=workers if workers > 0 else None,
+            max_depth=max_depth if max_depth >= 0 else None,
+            exclude=exclude.split()
+        )
+        local_searcher.max_results = max_results if max_results > 0 else None
+
     def do_alias(self, line):
         """Creates an alias for a command. Usage: 'alias <add/remove> <command> <alias-for-command>'"""
         try:
@@ -1136,7 +1368,7 @@ class RiosCLI(cmd.Cmd):
             if subcommand == "reset":
                 confirmation = ListMenu.spawn(["Yes", "No"])
                 if confirmation and confirmation.lower() == "yes":
-                    history_manager.history = []
+                    history_manager.clear()
                     print(f"{Fore.GREEN}Reset command history.")
             elif subcommand == "checkout":
                 TextPane.display(history_manager.history, title="Checkout Full History", show_lines_in_title=True)
@@ -1173,13 +1405,18 @@ class RiosCLI(cmd.Cmd):
         return AutoCompletion.matches_of(commands, text)
 
     def do__cache(self, line):
-        """Allows you to inspect the cache of certain commands."""
+        """Allows you to inspect the cache of certain commands, 'stats' shows the size, limits and hits of every cache."""
         if line.strip() == "--force-postloop-now":
             print(f"{Fore.LIGHTGREEN_EX}Forcing postloop routine...")
-            self.postloop()
+            # only the saving part, the session goes on (so write-behind and the http client have to stay alive)
+            cache_manager.save_all()
             print(f"{Fore.GREEN}Complete!")
             return
 
+        if line.strip() == "stats":
+            self.__display_cache_stats()
+            return
+
         # get valid command files
         command_files = []
         for file in os.listdir(cache_directory):
@@ -1207,16 +1444,129 @@ class RiosCLI(cmd.Cmd):
             return
 
         # display chosen command's cache
-        content = file_system.get_file_content_binary(os.path.join(cache_directory, command_file))
+        if command_file == os.path.basename(file_system.cache_file):
+            content = file_system.dump_cache()
+        elif os.path.isdir(os.path.join(cache_directory, command_file)):
+            # a cache per namespace (e.g. one per search engine)
+            content = {name: namespace.read() for name, namespace in cache_store.namespaces_in(command_file).items()}
+        else:
+            content = file_system.get_file_content_binary(os.path.join(cache_directory, command_file))
         stringified_content = json.dumps(content, indent=2, sort_keys=True, cls=SerializedEncoder)
         TextPane.display(stringified_content, title=command_file.upper(), show_lines_in_title=True)
 
+    @staticmethod
+    def __display_cache_stats():
+        def size(amount: Optional[int]) -> str:
+            if amount is None:
+                return "-"
+            for unit in ("B", "KB", "MB"):
+                if amount < 1024:
+                    return f"{amount:.0f}{unit}" if unit == "B" else f"{amount:.1f}{unit}"
+                amount /= 1024
+            return f"{amount:.1f}GB"
+
+        def ratio(value: Optional[float]) -> str:
+            return f"{value:.0%}" if value is not None else "-"
+
+        def duration(seconds: Optional[float], scale: int = 1000, unit: str = "ms") -> str:
+            return f"{seconds * scale:.1f}{unit}" if seconds is not None else "-"
+
+        cache_manager.enforce_limits()
+        rows = [
+            (row["cache"], row["entries"], f"{size(row['memory'])} / {size(row['max_memory'])}",
+             f"{size(row['disk'])} / {size(row['max_disk'])}", f"{row['hits']}/{row['misses']}",
+             ratio(row["hit_ratio"]), duration(row["avg_lookup_seconds"], scale=1_000_000, unit="µs"),
+             duration(row["load_seconds"]),
+             duration(row["save_seconds"]) + (f" ({row['save_errors']} failed)" if row["save_errors"] else ""),
+             row["evictions"])
+            for row in cache_manager.report()
+        ]
+        headers = ["Cache", "Entries", "Memory (limit)", "Disk (limit)", "Hits/Misses", "Hit %", "Avg Lookup",
+                   "Load", "Save", "Evictions"]
+        print(tabulate(rows, headers=headers, tablefmt="outline"))
+
     def complete__cache(self, text, line, begidx, endidx):
         del line, begidx, endidx
         commands = self.existing_commands.copy()
-        commands.append("--force-postloop-now")
+        commands.extend(["--force-postloop-now", "stats"])
         return AutoCompletion.matches_of(commands, text)
 
+    def do__profile(self, line):
+        """Shows where time goes, reports get saved to '.cache/profiles'. Usage: '_profile on [cpu|memory]|off|report'"""
+        args = line.strip().lower().split()
+        subcommand = args[0] if args else "report"
+        if subcommand == "on":
+            capture = args[1] if len(args) > 1 else None
+            if capture not in (None, "cpu", "memory"):
+                self.default(line)
+                return
+
+            profiler.start_capture(cpu=capture in (None, "cpu"), memory=capture in (None, "memory"))
+            print(f"{Fore.GREEN}Capturing {capture or 'cpu & memory'} of every command, '_profile off' stops it.")
+        elif subcommand in ("off", "report"):
+            if subcommand == "off" and not profiler.is_capturing:
+                print(f"{Fore.LIGHTBLACK_EX}Wasn't capturing.")
+                return
+
+            sections = self.__profile_sections()
+            report = profiler.stop_capture(sections) if subcommand == "off" else profiler.report(sections)
+            self.__display_profile(report)
+            print(f"{Fore.LIGHTBLACK_EX}Saved to '{profiler.dump(report)}'.")
+        else:
+            self.default(line)
+
+    def complete__profile(self, text, line, begidx, endidx):
+        del begidx, endidx
+        if line.strip().lower().startswith("_profile on"):
+            return AutoCompletion.matches_of(["cpu", "memory"], text)
+        return AutoCompletion.matches_of(["on", "off", "report"], text)
+
+    @staticmethod
+    def __profile_sections() -> Dict[str, Any]:
+        return {
+            "startup": [{"kind": kind, "name": name, "seconds": seconds}
+                        for kind, name, seconds in startup_timer.report()],
+            "caches": cache_manager.report(),
+        }
+
+    @staticmethod
+    def __display_profile(report: Dict[str, Any]):
+        def millis(seconds: float) -> str:
+            return f"{seconds * 1000:.1f}ms"
+
+        max_rows = 15
+        startup = [(row["kind"], row["name"], millis(row["seconds"])) for row in report["startup"]]
+        startup += [("stage", name, millis(seconds)) for name, seconds in report["stages"].items()]
+        print(tabulate(startup, headers=["Kind", "Name", "Time"], tablefmt="outline"))
+
+        imports = sorted(report["imports"], key=lambda row: -row["self_seconds"])[:max_rows]
+        print(tabulate([(row["module"], millis(row["seconds"]), millis(row["self_seconds"])) for row in imports],
+                       headers=["Slowest Imports", "Total", "Self"], tablefmt="outline"))
+
+        commands = [
+            (row["command"], row["count"], millis(row["wall_seconds"] / row["count"]), millis(row["max_wall_seconds"]),
+             millis(row["cpu_seconds"] / row["count"]),
+             f"{row['peak_memory'] / 1024:.0f}KB" if row["peak_memory"] is not None else "-")
+            for row in report["commands"][:max_rows]
+        ]
+        print(tabulate(commands, headers=["Command", "Runs", "Avg Wall", "Max Wall", "Avg CPU", "Peak Memory"],
+                       tablefmt="outline"))
+
+        if report.get("functions"):
+            functions = [(row["function"], row["calls"], millis(row["total_seconds"]), millis(row["cumulative_seconds"]))
+                         for row in report["functions"][:max_rows]]
+            print(tabulate(functions, headers=["Function", "Calls", "Self", "Cumulative"], tablefmt="outline"))
+
+        if report.get("allocations"):
+            allocations = [(row["location"], row["count"], f"{row['size'] / 1024:.0f}KB")
+                           for row in report["allocations"][:max_rows]]
+            print(tabulate(allocations, headers=["Allocated At", "Blocks", "Size"], tablefmt="outline"))
+
+    def do__startup(self, _):
+        """Shows how long starting up took, and which services were loaded (on first use) so far."""
+        rows = [(kind, name, f"{seconds * 1000:.1f}ms") for kind, name, seconds in startup_timer.report()]
+        print(tabulate(rows, headers=["Kind", "Name", "Time"], tablefmt="outline"))
+
     def do__fix(self, _):
         option = ListMenu.spawn(["Restart CLI", "Restart Windows Explorer"])
         if not option:
@@ -0,0 +1,58 @@
+"""
+Compares the result extractors of the web searcher on saved result pages.
+Usage: 'python -m benchmarks.extraction [repetitions]'
+"""
+import glob
+import os
+import sys
+import timeit
+from typing import Dict, List
+
+from services.search.extract import ResultExtractor, RegexExtractor, LxmlExtractor, SoupExtractor, default_extractor, \
+    lxml
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "res", "fixtures")
+
+
+def extractors() -> Dict[str, ResultExtractor]:
+    candidates = {
+        "soup (full parse)": SoupExtractor(strained=False),
+        "soup (strained)": SoupExtractor(strained=True),
+        "regex": RegexExtractor(),
+        "default": default_extractor(),
+    }
+    if lxml is not None:
+        candidates["lxml"] = LxmlExtractor()
+    return candidates
+
+
+def normalized(results) -> List[tuple]:
+    return [(" ".join(title.split()), href) for title, href in results]
+
+
+def main(repetitions: int = 50) -> None:
+    pages = sorted(glob.glob(os.path.join(FIXTURES_DIR, "ddg_*.html")))
+    if not pages:
+        print(f"No fixture pages found in {FIXTURES_DIR}")
+        return
+
+    for page_file in pages:
+        with open(page_file, encoding="utf-8") as f:
+            page = f.read()
+
+        print(f"{os.path.basename(page_file)} ({len(page) // 1024}KB, {repetitions} runs)")
+        baseline_time = None
+        baseline_results = None
+        for name, extractor in extractors().items():
+            results = normalized(extractor.extract(page))
+            seconds = min(timeit.repeat(lambda: extractor.extract(page), number=repetitions, repeat=3)) / repetitions
+            if baseline_time is None:
+                baseline_time, baseline_results = seconds, results
+
+            same = "ok" if results == baseline_results else "DIFFERENT RESULTS"
+            print(f"  {name:<20} {seconds * 1000:8.3f} ms/page  {baseline_time / seconds:6.1f}x  "
+                  f"{len(results)} results  {same}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
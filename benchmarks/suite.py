@@ -0,0 +1,413 @@
+"""
+Benchmarks the hot paths (listing, hashing, searching, matching, caching and rendering) on a synthetic directory tree.
+Results are written as JSON and compared against a stored baseline, the run fails if anything regressed.
+Usage: 'python -m benchmarks.suite [--files N] [--repetitions N] [--only PATTERN ...] [--save-baseline]'
+       (see --help for the rest)
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime, timedelta
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, Final, Iterator, List, Optional, Tuple
+
+from etc.utils import FuzzyMatcher
+from services.internal.history import HistoryManager
+from services.osys.cache import DirectoryCache
+from services.osys.fs import File, FileSystem
+from services.osys.hashing import HashCache
+from services.search.local import LocalSearcher
+
+from .tree import SyntheticTree, WORDS
+
+RESULTS_DIR: Final[str] = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, ".cache", "benchmarks")
+# differences below this are noise, no matter how big they are relatively
+MIN_REGRESSION_SECONDS: Final[float] = 0.0005
+QUERIES: Final[List[str]] = ["holiday photo", "final report 00042", "sesaon episdoe", "trailer.mkv", "xyz"]
+
+
+class Benchmark:
+    """
+    Something to time: setup runs (untimed) before every run and its result gets passed to run, so every run can
+    start from the same state (e.g. a cold cache). Creating a benchmark should be cheap, anything expensive that's
+    shared between runs is prepared on first use (see lru_cache below), so benchmarks that are filtered out cost
+    nothing.
+    """
+
+    def __init__(self, name: str, run: Callable[[Any], Any], setup: Optional[Callable[[], Any]] = None,
+                 operations: int = 1):
+        self.name: Final[str] = name
+        self.run: Final[Callable[[Any], Any]] = run
+        self.setup: Final[Callable[[], Any]] = setup or (lambda: None)
+        # how many operations (calls, files, queries...) a single run does
+        self.operations: Final[int] = operations
+
+    def measure(self, repetitions: int) -> Dict[str, Any]:
+        # the first run (imports, first use of everything) doesn't count
+        self.run(self.setup())
+
+        timings = []
+        for _ in range(repetitions):
+            state = self.setup()
+            started_at = time.perf_counter()
+            self.run(state)
+            timings.append(time.perf_counter() - started_at)
+
+        return {
+            "runs": repetitions,
+            "operations": self.operations,
+            "min_seconds": min(timings),
+            "median_seconds": statistics.median(timings),
+            "mean_seconds": statistics.fmean(timings),
+        }
+
+
+class Workspace:
+    """
+    Hands out fresh (empty) cache directories, all within one temporary directory.
+    """
+
+    def __init__(self, root: str):
+        self.root: Final[str] = root
+        self.__count: int = 0
+
+    def cache_dir(self) -> str:
+        self.__count += 1
+        cache_dir = os.path.join(self.root, f"cache-{self.__count}")
+        os.makedirs(cache_dir)
+        return cache_dir
+
+
+@contextmanager
+def silenced() -> Iterator[None]:
+    # tables are printed to the stdout they were given when they got imported, so it's silenced at the file
+    # descriptor level instead of swapping sys.stdout
+    sys.stdout.flush()
+    stdout_fd = sys.stdout.fileno()
+    saved_fd = os.dup(stdout_fd)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), stdout_fd)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved_fd, stdout_fd)
+            os.close(saved_fd)
+
+
+def files_of(tree: SyntheticTree) -> List[File]:
+    files = []
+    for path in tree.files:
+        stat = os.stat(path)
+        files.append(File(name=os.path.basename(path), location=os.path.dirname(path),
+                          size_mb=stat.st_size / (1024 * 1024), last_updated=stat.st_mtime, file_hash="N/A"))
+    return files
+
+
+def listing_benchmarks(tree: SyntheticTree, workspace: Workspace) -> List[Benchmark]:
+    paths = tree.directories + [f"{directory} --flag" for directory in tree.directories]
+
+    def clean_paths(_):
+        for path in paths:
+            FileSystem.clean_path(path, filter_args=True)
+
+    def cold_file_system() -> FileSystem:
+        file_system = FileSystem(workspace.cache_dir())
+        # (the same caches the cache manager loads at startup)
+        for cache in (file_system.directory_cache, file_system.hash_cache, file_system.file_types):
+            cache.load()
+        return file_system
+
+    def list_all(file_system: FileSystem):
+        for directory in tree.directories:
+            file_system.get_files_in_directory(directory)
+
+    @lru_cache(maxsize=None)
+    def warm_file_system() -> FileSystem:
+        return cold_file_system()
+
+    return [
+        Benchmark("clean_path", clean_paths, operations=len(paths)),
+        Benchmark("get_files_in_directory (cold)", list_all, setup=cold_file_system,
+                  operations=len(tree.directories)),
+        Benchmark("get_files_in_directory (cached)", list_all, setup=warm_file_system,
+                  operations=len(tree.directories)),
+    ]
+
+
+def hashing_benchmarks(tree: SyntheticTree, workspace: Workspace, max_files: int = 500) -> List[Benchmark]:
+    files = tree.files[:max_files]
+
+    def hash_all(file_system: FileSystem):
+        for file in files:
+            file_system.get_file_hash(file)
+
+    @lru_cache(maxsize=None)
+    def warm_file_system() -> FileSystem:
+        return FileSystem(workspace.cache_dir())
+
+    return [
+        Benchmark("get_file_hash (cold)", hash_all, setup=lambda: FileSystem(workspace.cache_dir()),
+                  operations=len(files)),
+        Benchmark("get_file_hash (cached)", hash_all, setup=warm_file_system, operations=len(files)),
+    ]
+
+
+def search_benchmarks(tree: SyntheticTree, workspace: Workspace) -> List[Benchmark]:
+    names = [os.path.basename(file) for file in tree.files]
+
+    def search_all(searcher: LocalSearcher, top_k: Optional[int] = None):
+        for query in QUERIES:
+            searcher.search([tree.root], query, top_k=top_k)
+
+    def match_all(_):
+        for query in QUERIES:
+            FuzzyMatcher.any_matches(query, names)
+
+    @lru_cache(maxsize=None)
+    def warm_searcher() -> LocalSearcher:
+        searcher = LocalSearcher(cache_dir=workspace.cache_dir())
+        searcher.get_index(tree.root)
+        # the tree doesn't change, refreshing the index (after REFRESH_INTERVAL) would only turn long runs into
+        # index builds
+        searcher.REFRESH_INTERVAL = timedelta.max
+        return searcher
+
+    return [
+        Benchmark("LocalSearcher.search (index build)", lambda searcher: searcher.search([tree.root], QUERIES[0]),
+                  setup=lambda: LocalSearcher(cache_dir=workspace.cache_dir())),
+        Benchmark("LocalSearcher.search", search_all, setup=warm_searcher, operations=len(QUERIES)),
+        Benchmark("LocalSearcher.search (top 10)", lambda searcher: search_all(searcher, top_k=10),
+                  setup=warm_searcher, operations=len(QUERIES)),
+        Benchmark("FuzzyMatcher.any_matches", match_all, operations=len(QUERIES)),
+    ]
+
+
+class CacheRoundTrip:
+    """
+    How to create, fill and read back a cache, to benchmark saving and loading it.
+    """
+
+    def __init__(self, name: str, create: Callable[[str], Any], fill: Callable[[Any], None],
+                 read_back: Callable[[Any], None]):
+        self.name: Final[str] = name
+        self.create: Final[Callable[[str], Any]] = create
+        self.fill: Final[Callable[[Any], None]] = fill
+        self.read_back: Final[Callable[[Any], None]] = read_back
+
+    def filled(self, cache_dir: str) -> Any:
+        cache = self.create(cache_dir)
+        cache.load()
+        self.fill(cache)
+        return cache
+
+    def saved(self, cache_dir: str) -> Any:
+        self.filled(cache_dir).save()
+        return self.create(cache_dir)
+
+    def load(self, cache: Any) -> None:
+        cache.load()
+        self.read_back(cache)
+
+
+def cache_benchmarks(tree: SyntheticTree, workspace: Workspace, history_lines: int = 1000) -> List[Benchmark]:
+    @lru_cache(maxsize=None)
+    def listings() -> Dict[str, List[File]]:
+        by_directory = {}
+        for file in files_of(tree):
+            by_directory.setdefault(file.location, []).append(file)
+        return by_directory
+
+    @lru_cache(maxsize=None)
+    def signatures() -> Dict[str, Tuple[int, int, int]]:
+        return {path: HashCache.signature_of(os.stat(path)) for path in tree.files}
+
+    def fill_listings(cache: DirectoryCache):
+        for directory, directory_files in listings().items():
+            cache.put(directory, DirectoryCache.signature_of(directory), directory_files, [])
+
+    def read_listings(cache: DirectoryCache):
+        for directory in listings():
+            cache.get(directory)
+
+    def fill_hashes(cache: HashCache):
+        for index, (path, signature) in enumerate(signatures().items()):
+            cache.put(path, signature, f"{index:016x}")
+
+    def read_hashes(cache: HashCache):
+        for path, signature in signatures().items():
+            cache.get(path, signature)
+
+    def fill_history(history: HistoryManager):
+        for index in range(history_lines):
+            history.record_line(f"search {WORDS[index % len(WORDS)]} --limit {index}")
+
+    round_trips = [
+        CacheRoundTrip("ls.listings", lambda cache_dir: DirectoryCache(store_file=os.path.join(cache_dir, "ls.db")),
+                       fill_listings, read_listings),
+        CacheRoundTrip("ls.hashes", HashCache, fill_hashes, read_hashes),
+        CacheRoundTrip("search.local", lambda cache_dir: LocalSearcher(cache_dir=cache_dir),
+                       lambda searcher: searcher.get_index(tree.root),
+                       lambda searcher: searcher.get_index(tree.root, refresh=False)),
+        CacheRoundTrip("history", HistoryManager, fill_history, lambda _: None),
+    ]
+
+    benchmarks = []
+    for round_trip in round_trips:
+        benchmarks.append(Benchmark(f"cache {round_trip.name} save", lambda cache: cache.save(),
+                                    setup=lambda _round_trip=round_trip: _round_trip.filled(workspace.cache_dir())))
+        benchmarks.append(Benchmark(f"cache {round_trip.name} load", round_trip.load,
+                                    setup=lambda _round_trip=round_trip: _round_trip.saved(workspace.cache_dir())))
+    return benchmarks
+
+
+def rendering_benchmarks(tree: SyntheticTree) -> List[Benchmark]:
+    @lru_cache(maxsize=None)
+    def files() -> List[File]:
+        return files_of(tree)
+
+    @lru_cache(maxsize=None)
+    def cli() -> Any:
+        # (the CLI pulls in everything, so it's only imported when rendering gets benchmarked)
+        from CLI import RiosCLI
+
+        # list_files doesn't need the rest of the CLI to be set up
+        return RiosCLI.__new__(RiosCLI)
+
+    def render(**kwargs):
+        with silenced():
+            cli().list_files(files(), **kwargs)
+
+    return [
+        Benchmark("list_files", lambda _: render(), setup=files, operations=len(tree.files)),
+        Benchmark("list_files (sorted, page of 50)", lambda _: render(sort_by="size", limit=50, page=2),
+                  setup=files, operations=len(tree.files)),
+    ]
+
+
+def run(tree: SyntheticTree, workspace: Workspace, repetitions: int, only: List[str]) -> Dict[str, Dict[str, Any]]:
+    groups: Dict[str, Callable[[], List[Benchmark]]] = {
+        "listing": lambda: listing_benchmarks(tree, workspace),
+        "hashing": lambda: hashing_benchmarks(tree, workspace),
+        "search": lambda: search_benchmarks(tree, workspace),
+        "caches": lambda: cache_benchmarks(tree, workspace),
+        "rendering": lambda: rendering_benchmarks(tree),
+    }
+
+    results = {}
+    for group_name, group in groups.items():
+        # a benchmark that fails (or can't run on this platform) is reported, it doesn't stop the others
+        try:
+            benchmarks = [benchmark for benchmark in group()
+                          if not only or any(fnmatchcase(benchmark.name, pattern) for pattern in only)]
+        except Exception as e:
+            print(f"  {f'({group_name} setup)':<40} FAILED: {type(e).__name__}: {e}")
+            continue
+
+        for benchmark in benchmarks:
+            try:
+                result = benchmark.measure(repetitions)
+            except Exception as e:
+                results[benchmark.name] = {"error": f"{type(e).__name__}: {e}"}
+                print(f"  {benchmark.name:<40} FAILED: {results[benchmark.name]['error']}")
+                continue
+
+            results[benchmark.name] = result
+            print(f"  {benchmark.name:<40} {result['median_seconds'] * 1000:10.3f} ms  "
+                  f"(min {result['min_seconds'] * 1000:.3f} ms, {result['operations']} ops)")
+    return results
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compares the median times of a report with those of a baseline.
+
+    :param report: The report of this run.
+    :param baseline: The report to compare with.
+    :param threshold: How much slower (relatively, e.g. 0.2 for 20%) a benchmark may get before it's a regression.
+    :return: The names of the benchmarks that regressed.
+    """
+    if baseline.get("parameters") != report["parameters"]:
+        print("The baseline was recorded with different parameters, not comparing.")
+        return []
+
+    regressions = []
+    for name, result in report["results"].items():
+        baseline_result = baseline["results"].get(name)
+        if "error" in result or not baseline_result or "error" in baseline_result:
+            continue
+
+        before, after = baseline_result["median_seconds"], result["median_seconds"]
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold and after - before > MIN_REGRESSION_SECONDS
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<40} {before * 1000:10.3f} -> {after * 1000:10.3f} ms  {change:+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the hot paths on a synthetic directory tree.")
+    parser.add_argument("--files", type=int, default=2000, help="amount of files in the tree")
+    parser.add_argument("--depth", type=int, default=3, help="levels of subdirectories in the tree")
+    parser.add_argument("--fanout", type=int, default=4, help="subdirectories per directory")
+    parser.add_argument("--file-size", type=int, default=4096, help="average file size (bytes)")
+    parser.add_argument("--repetitions", type=int, default=10, help="timed runs per benchmark")
+    parser.add_argument("--only", nargs="*", default=[], help="only runs benchmarks matching these (wildcard) names")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"), help="where to write results")
+    parser.add_argument("--baseline", default=os.path.join(RESULTS_DIR, "baseline.json"),
+                        help="results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="stores the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="how much slower a benchmark may get before it's a regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    temp_dir = tempfile.mkdtemp(prefix="rcli-bench-")
+    try:
+        tree = SyntheticTree(os.path.join(temp_dir, "tree"), files=args.files, depth=args.depth, fanout=args.fanout,
+                             file_size=args.file_size).create()
+        print(f"{len(tree.files)} files in {len(tree.directories)} directories, {args.repetitions} runs each")
+        results = run(tree, Workspace(os.path.join(temp_dir, "caches")), args.repetitions, args.only)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": tree.parameters(),
+        "repetitions": args.repetitions,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(file=args.output, mode="w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to '{args.output}'.")
+
+    regressions = []
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Stored as the baseline ('{args.baseline}').")
+    elif os.path.exists(args.baseline):
+        with open(file=args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Compared with the baseline of {baseline.get('created_at')}:")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Generates synthetic directory trees for the benchmarks, the same parameters (and seed) always give the same tree.
+"""
+import os
+import random
+from typing import Final, List
+
+WORDS: Final[List[str]] = [
+    "report", "holiday", "invoice", "episode", "season", "final", "draft", "backup", "photo", "music", "project",
+    "notes", "setup", "readme", "budget", "lecture", "trailer", "scan", "export", "archive", "summer", "meeting",
+]
+EXTENSIONS: Final[List[str]] = [".txt", ".pdf", ".mp4", ".mkv", ".jpg", ".png", ".mp3", ".zip", ".py", ".docx", ".csv",
+                                ""]
+
+
+class SyntheticTree:
+    """
+    A directory tree of `depth` levels with `fanout` subdirectories per directory, the files are spread evenly over
+    all of its directories. Files are filled with random bytes, `file_size` being their average size.
+    """
+    HIDDEN_FILE_RATIO: Final[float] = 0.05
+
+    def __init__(self, root: str, files: int = 2000, depth: int = 3, fanout: int = 4, file_size: int = 4096,
+                 seed: int = 42):
+        self.root: Final[str] = os.path.abspath(root)
+        self.file_count: Final[int] = files
+        self.depth: Final[int] = depth
+        self.fanout: Final[int] = fanout
+        self.file_size: Final[int] = file_size
+        self.seed: Final[int] = seed
+        # (filled in by create)
+        self.directories: List[str] = []
+        self.files: List[str] = []
+
+    def create(self) -> "SyntheticTree":
+        rng = random.Random(self.seed)
+
+        self.directories = [self.root]
+        level = [self.root]
+        for _ in range(self.depth):
+            next_level = []
+            for parent in level:
+                for index in range(self.fanout):
+                    next_level.append(os.path.join(parent, f"{rng.choice(WORDS)}_{index}"))
+            self.directories.extend(next_level)
+            level = next_level
+
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+
+        self.files = []
+        for index in range(self.file_count):
+            directory = self.directories[index % len(self.directories)]
+            name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {index:05d}{rng.choice(EXTENSIONS)}"
+            if rng.random() < self.HIDDEN_FILE_RATIO:
+                name = f".{name}"
+
+            file = os.path.join(directory, name)
+            with open(file=file, mode="wb") as f:
+                f.write(rng.randbytes(rng.randint(0, 2 * self.file_size)))
+            self.files.append(file)
+        return self
+
+    def parameters(self) -> dict:
+        return {"files": self.file_count, "depth": self.depth, "fanout": self.fanout, "file_size": self.file_size,
+                "seed": self.seed}
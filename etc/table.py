@@ -0,0 +1,63 @@
+import itertools
+import re
+import sys
+from typing import Final, Iterable, Iterator, List, Optional, Sequence, IO
+
+ANSI_ESCAPE_PATTERN: Final[re.Pattern] = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def visible_length(text: str) -> int:
+    """
+    Gets the length of a string as it shows up in the terminal (so without color codes).
+    :param text: String that might contain ANSI color codes
+    :return: The visible length of the string
+    """
+    return len(ANSI_ESCAPE_PATTERN.sub("", text))
+
+
+class StreamingTable:
+    """
+    Renders a table row by row, instead of formatting the entire thing up front like tabulate does.
+    Column widths get computed from (at most) the first `sample_size` rows, later rows that are wider simply overflow.
+    """
+    COLUMN_GAP: Final[str] = "  "
+
+    def __init__(self, headers: Sequence[str], colalign: Optional[Sequence[str]] = None, sample_size: int = 256):
+        self.headers: Final[Sequence[str]] = headers
+        self.colalign: Final[Sequence[str]] = colalign or ["left"] * len(headers)
+        self.sample_size: Final[int] = sample_size
+
+    def render(self, rows: Iterable[Sequence[str]]) -> Iterator[str]:
+        """
+        Renders the table, yielding one line at a time.
+        :param rows: The rows (lists of cells) of the table, can be a lazy iterable.
+        :return: An iterator over the lines of the table.
+        """
+        rows = iter(rows)
+        sample = list(itertools.islice(rows, self.sample_size))
+
+        widths = [visible_length(header) for header in self.headers]
+        for row in sample:
+            for index, cell in enumerate(row):
+                widths[index] = max(widths[index], visible_length(cell))
+
+        yield self.__format_row(self.headers, widths)
+        yield self.COLUMN_GAP.join("-" * width for width in widths)
+        for row in itertools.chain(sample, rows):
+            yield self.__format_row(row, widths)
+
+    def print(self, rows: Iterable[Sequence[str]], file: IO = sys.stdout) -> None:
+        """
+        Prints the table, flushing every line so rows show up as soon as they're rendered.
+        :param rows: The rows (lists of cells) of the table, can be a lazy iterable.
+        :param file: Where to print the table to.
+        """
+        for line in self.render(rows):
+            print(line, file=file, flush=True)
+
+    def __format_row(self, row: Sequence[str], widths: List[int]) -> str:
+        cells = []
+        for cell, width, align in zip(row, widths, self.colalign):
+            padding = " " * max(0, width - visible_length(cell))
+            cells.append(padding + cell if align == "right" else cell + padding)
+        return self.COLUMN_GAP.join(cells).rstrip()
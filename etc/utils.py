@@ -2,12 +2,20 @@ import enum
 import os
 import re
 import threading
+from collections import defaultdict
 from enum import auto
-from typing import List, Any, Final, Optional
+from typing import List, Any, Final, Optional, Callable, Sequence, Tuple, Dict, Set
 
-from fuzzywuzzy import process, fuzz
 from playsound import playsound
 
+try:
+    # scores whole arrays of candidates in C++, fuzzywuzzy (slow to import) is only a fallback
+    from rapidfuzz import process as rapid_process, fuzz as rapid_fuzz, utils as rapid_utils
+    process = fuzz = fuzz_utils = None
+except ImportError:
+    rapid_process = rapid_fuzz = rapid_utils = None
+    from fuzzywuzzy import process, fuzz, utils as fuzz_utils
+
 
 def escape_windows_safe_filename(unsafe: str) -> str:
     """
@@ -76,6 +84,38 @@ def get_latest_existing_path(current_directory: str, line: str) -> str:
     return path
 
 
+class TrigramIndex:
+    """
+    Maps every trigram to the candidates that contain it, so scoring can skip candidates that share nothing with
+    the query. This is a heuristic, candidates without a single shared trigram are assumed to score too low.
+    """
+
+    def __init__(self, candidates: Sequence[str]):
+        self.trigrams: Dict[str, List[int]] = defaultdict(list)
+        for index, candidate in enumerate(candidates):
+            for trigram in TrigramIndex.trigrams_of(candidate):
+                self.trigrams[trigram].append(index)
+
+    @staticmethod
+    def trigrams_of(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def candidates_for(self, query: str) -> Optional[Set[int]]:
+        """
+        Gets the candidates that share at least one trigram with the query.
+        :param query: Normalized query
+        :return: Indices of the candidates, or None if the query is too short to filter on
+        """
+        query_trigrams = TrigramIndex.trigrams_of(query)
+        if not query_trigrams:
+            return None
+
+        indices = set()
+        for trigram in query_trigrams:
+            indices.update(self.trigrams.get(trigram, ()))
+        return indices
+
+
 class FuzzyMatcher:
     RECOMMENDED_MATCHING_SCORE: Final[int] = 85
     required_matching_score: int = 50
@@ -85,11 +125,64 @@ class FuzzyMatcher:
         return [t[0] for t in tokens]
 
     @staticmethod
-    def any_matches(matching_token: str, tokens: List[str], limit: Optional[int] = None) -> List[str]:
+    def normalize(text: str) -> str:
+        """
+        Normalizes a string the same way the scorers do (lowercase, no special characters, trimmed).
+        Candidates that get scored often should be normalized once, up front.
+        :param text: String to normalize
+        :return: Normalized string
+        """
+        if rapid_utils:
+            return rapid_utils.default_process(text)
+        return fuzz_utils.full_process(text)
+
+    @staticmethod
+    def any_matches(matching_token: str, tokens: List[Any], limit: Optional[int] = None) -> List[Any]:
         cutoff = limit if limit else FuzzyMatcher.required_matching_score
+        if rapid_process:
+            choices = [str(token) for token in tokens]
+            matches = rapid_process.extract(matching_token, choices, scorer=rapid_fuzz.WRatio,
+                                            processor=rapid_utils.default_process, score_cutoff=cutoff, limit=None)
+            return [tokens[index] for _, _, index in matches]
+
         matches = process.extractBests(matching_token, tokens, limit=len(tokens), score_cutoff=cutoff)
         return FuzzyMatcher._fuzzy_formatter(matches)
 
+    @staticmethod
+    def score_batch(query: str, candidates: Sequence[str], score_cutoff: float,
+                    indices: Optional[Sequence[int]] = None, trigrams: Optional[TrigramIndex] = None) -> \
+            List[Tuple[int, float]]:
+        """
+        Scores a query against many (already normalized) candidates in one go, using token sort ratio.
+        :param query: The query, gets normalized here
+        :param candidates: Normalized candidates (see normalize)
+        :param score_cutoff: The minimum score a candidate needs
+        :param indices: Only scores the candidates at these indices (all of them if None)
+        :param trigrams: Trigram index of the candidates, used to prefilter when scoring in pure Python
+        :return: A list of (index, score) tuples of the candidates that scored at least score_cutoff
+        """
+        query = FuzzyMatcher.normalize(query)
+        if indices is None:
+            indices = range(len(candidates))
+
+        if rapid_process:
+            choices = [candidates[i] for i in indices] if not isinstance(indices, range) else candidates
+            scores = rapid_process.cdist([query], choices, scorer=rapid_fuzz.token_sort_ratio, processor=None,
+                                         score_cutoff=score_cutoff, workers=-1)[0]
+            return [(indices[i], float(scores[i])) for i in scores.nonzero()[0]]
+
+        if trigrams is not None:
+            prefiltered = trigrams.candidates_for(query)
+            if prefiltered is not None:
+                indices = [i for i in indices if i in prefiltered]
+
+        results = []
+        for i in indices:
+            score = fuzz.token_sort_ratio(query, candidates[i], force_ascii=False, full_process=False)
+            if score >= score_cutoff:
+                results.append((i, score))
+        return results
+
 
 class AutoCompletion:
     TYPE_ALL: Final[enum.auto] = auto()
@@ -101,6 +194,9 @@ class AutoCompletion:
     MODE_PARTIAL: Final[enum.auto] = auto()
     MODE_MATCH_ANY: Final[enum.auto] = auto()
 
+    # lists the directories within a directory, set this to go through a (cached) lister instead of the disk
+    directory_lister: Optional[Callable[[str], List[str]]] = None
+
     @staticmethod
     def path(current_directory: str, text: str, completion_type=TYPE_ALL) -> List[str]:
         if "~" in current_directory:
@@ -108,6 +204,9 @@ class AutoCompletion:
                                              current_directory.split("~").pop().removeprefix("\\"))
 
         def path_filter():
+            if completion_type == AutoCompletion.TYPE_DIRECTORIES and AutoCompletion.directory_lister:
+                return AutoCompletion.matches_of(AutoCompletion.directory_lister(current_directory), text)
+
             if not text:
                 completion = os.listdir(current_directory)
             else:
@@ -137,7 +236,8 @@ class AutoCompletion:
         text = text.lower()
 
         if completion_mode == AutoCompletion.MODE_PARTIAL:
-            best_match = max(possible_matches, key=lambda match: fuzz.ratio(text, match))
+            scorer = rapid_fuzz or fuzz
+            best_match = max(possible_matches, key=lambda match: scorer.ratio(text, match))
             return [best_match]
         elif completion_mode == AutoCompletion.MODE_MATCH_ANY:
             return FuzzyMatcher.any_matches(text, possible_matches)
@@ -2,21 +2,25 @@ import argparse
 import os
 import sys
 import threading
-import tkinter as tk
+import time
 import webbrowser
-from tkinter import scrolledtext
 from typing import Final
 
 import pretty_errors
 
+# (first, so the imports of the CLI get timed)
+from services import startup_timer
 from CLI import RiosCLI
 from etc.ffm import check_for_ffmpeg, install_ffmpeg
-from services.internal.reloader import HotReloader
 
 PRETTY_ERRORS: Final[bool] = True
 
 
 def show_error_popup(error: Exception or str) -> None:
+    # only needed when things go wrong, no need to import it on every start
+    import tkinter as tk
+    from tkinter import scrolledtext
+
     def close_window():
         window.destroy()
 
@@ -71,18 +75,24 @@ def is_correct_python_version() -> bool:
 
 
 def main(argc: int, argv: argparse.Namespace) -> None:
+    hot_reloader = None
     try:
         # loading text
         os.system("title Loading CLI...")
         print("Loading CLI...")
 
         # setup
-        cli = RiosCLI()
+        startup_timer.record_stage("interpreter, imports & checks", time.time() - startup_timer.process_started_at)
+        with startup_timer.stage("setup"):
+            cli = RiosCLI()
 
         if argc > 0:
             print("OPTIONS:")
             if argv.enable_hot_reloading:
                 print("WITH: Hot reloading")
+                # (watchdog is only imported when hot reloading is used)
+                from services.internal.reloader import HotReloader
+                hot_reloader = HotReloader
                 watcher_thread = threading.Thread(target=HotReloader.start, args=(cli,))
                 watcher_thread.daemon = True
                 watcher_thread.start()
@@ -93,6 +103,8 @@ def main(argc: int, argv: argparse.Namespace) -> None:
     except Exception as ex:
         raise ex
     finally:
+        if hot_reloader is not None:
+            hot_reloader.stop()
         print("Cya!")
 
 
@@ -139,5 +151,4 @@ if __name__ == "__main__":
         # fatal error
         show_error_popup(e)
     finally:
-        HotReloader.stop()
         sys.exit(0)
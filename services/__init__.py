@@ -1,21 +1,102 @@
+import importlib
 import os
-from typing import Final
+from typing import Final, TYPE_CHECKING
 
-from .osys import COMService, ProcessManager
-from .osys.fs import FileSystem
-from .osys.info import sysinfo
-from .search.web import DuckDuckGoSearcher, WebSearcher
-from .search.local import LocalSearcher
+from .internal.profiling import ImportTimer, Profiler
+
+# as early as possible, so the imports below (and those of the services, once they're loaded) get timed
+import_timer = ImportTimer(packages=["services", "etc", "CLI"])
+import_timer.install()
+
+from .internal.lazy import LazyProxy, StartupTimer
+from .internal.caching import CacheManager, WriteBehind
 from .internal.history import HistoryManager
+from .internal.store import CacheStore
+
+if TYPE_CHECKING:
+    from .inet.http import HttpClient
+    from .osys import COMService, ProcessManager
+    from .osys.fs import FileSystem
+    from .search.fanout import FanOutSearcher
+    from .search.local import LocalSearcher
+
+MB: Final[int] = 1024 * 1024
+
+startup_timer = StartupTimer()
 
 cache_directory: Final[str] = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, ".cache")
 if not os.path.exists(cache_directory):
     os.mkdir(cache_directory)
 
-file_system = FileSystem(cache_directory)
-processes = ProcessManager()
-com = COMService()
-local_searcher = LocalSearcher(cache_dir=cache_directory)
-web_searcher = DuckDuckGoSearcher(cache_dir=cache_directory,
-                                  query_url=f"https://duckduckgo.com/html/?q={WebSearcher.QUERY_PLACEHOLDER}")
+profiler = Profiler(os.path.join(cache_directory, "profiles"), import_timer)
+cache_manager = CacheManager()
+write_behind = WriteBehind(cache_manager)
+cache_store = CacheStore(cache_directory)
 history_manager = HistoryManager(cache_directory)
+cache_manager.register("history", history_manager, max_disk=4 * MB)
+
+
+# the services below (and whatever they import) are only created once they're used,
+# their caches get registered (and loaded, if startup already happened) at that point
+def _create_file_system() -> "FileSystem":
+    from .osys.fs import FileSystem
+
+    file_system = FileSystem(cache_directory)
+    cache_manager.register("ls.listings", file_system.directory_cache)
+    cache_manager.register("ls.hashes", file_system.hash_cache, max_memory=32 * MB)
+    cache_manager.register("ls.filetypes", file_system.file_types)
+    return file_system
+
+
+def _create_processes() -> "ProcessManager":
+    from .osys import ProcessManager
+    return ProcessManager()
+
+
+def _create_com() -> "COMService":
+    from .osys import COMService
+    return COMService()
+
+
+def _create_http_client() -> "HttpClient":
+    from .inet.http import HttpClient
+    return HttpClient()
+
+
+def _create_local_searcher() -> "LocalSearcher":
+    from .search.local import LocalSearcher
+
+    local_searcher = LocalSearcher(cache_dir=cache_directory, store=cache_store)
+    cache_manager.register("search.local", local_searcher, max_memory=64 * MB)
+    return local_searcher
+
+
+def _create_web_searcher() -> "FanOutSearcher":
+    from .search.fanout import FanOutSearcher
+    from .search.web import DuckDuckGoSearcher, BingSearcher, MojeekSearcher, WebSearcher
+
+    web_searcher = FanOutSearcher(engines=[
+        DuckDuckGoSearcher(cache_dir=cache_directory,
+                           query_url=f"https://duckduckgo.com/html/?q={WebSearcher.QUERY_PLACEHOLDER}",
+                           http=http_client, store=cache_store),
+        BingSearcher(cache_dir=cache_directory,
+                     query_url=f"https://www.bing.com/search?q={WebSearcher.QUERY_PLACEHOLDER}",
+                     http=http_client, store=cache_store),
+        MojeekSearcher(cache_dir=cache_directory,
+                       query_url=f"https://www.mojeek.com/search?q={WebSearcher.QUERY_PLACEHOLDER}",
+                       http=http_client, store=cache_store),
+    ])
+    for engine in web_searcher.engines:
+        cache_manager.register(f"search.{engine.name}", engine, max_disk=8 * MB)
+    return web_searcher
+
+
+file_system = LazyProxy("file_system", _create_file_system, startup_timer)
+processes = LazyProxy("processes", _create_processes, startup_timer)
+com = LazyProxy("com", _create_com, startup_timer)
+http_client = LazyProxy("http_client", _create_http_client, startup_timer)
+local_searcher = LazyProxy("local_searcher", _create_local_searcher, startup_timer)
+web_searcher = LazyProxy("web_searcher", _create_web_searcher, startup_timer)
+# (importing these replaces the proxies in this module with the actual packages)
+youtube = LazyProxy("youtube", lambda: importlib.import_module(".youtube", __name__), startup_timer)
+anime = LazyProxy("anime", lambda: importlib.import_module(".anime", __name__), startup_timer)
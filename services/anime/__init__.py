@@ -2,7 +2,7 @@ from typing import Final
 
 from anipy_api.provider import get_provider
 
-from .. import cache_directory
+from .. import cache_directory, cache_manager
 from .downloader_service import Downloader
 from .lookup_service import Search
 
@@ -10,4 +10,5 @@ ANIME_PROVIDER: Final[str] = "gogoanime"
 
 provider = get_provider(ANIME_PROVIDER)
 lookup = Search(cache_dir=cache_directory, provider=provider)
+cache_manager.register("anime", lookup, max_disk=16 * 1024 * 1024)
 downloader = Downloader()
@@ -7,14 +7,45 @@ from typing import List, Dict, Tuple, Final
 from anipy_api.anime import Anime
 from anipy_api.provider import BaseProvider, LanguageTypeEnum, Episode
 
+from ..internal.caching import CacheStats, ManagedCache
+from ..internal.store import write_atomic
 
-class Search:
+
+class Search(ManagedCache):
     CACHE_EXPIRATION_TIME: Final[timedelta] = timedelta(hours=12)
+    ANIME_SIZE_ESTIMATE: Final[int] = 500
 
     def __init__(self, cache_dir: str, provider: BaseProvider):
         self.cache_file = os.path.join(cache_dir, "anime.cache")
         self.provider = provider
         self.animes_cache: Dict[str, Tuple[float, List[Anime]]] = {}
+        self.stats: CacheStats = CacheStats()
+        self.is_dirty: bool = False
+
+    def entry_count(self) -> int:
+        return len(self.animes_cache)
+
+    def memory_size(self) -> int:
+        return sum(len(animes) + 1 for _, animes in self.animes_cache.values()) * self.ANIME_SIZE_ESTIMATE
+
+    def disk_size(self) -> int:
+        return self.file_size(self.cache_file)
+
+    def has_changes(self) -> bool:
+        return self.is_dirty
+
+    def evict(self, max_memory: int) -> int:
+        # oldest searches go first
+        evicted = 0
+        size = self.memory_size()
+        for anime_name, (_, animes) in sorted(self.animes_cache.items(), key=lambda item: item[1][0]):
+            if size <= max_memory:
+                break
+            del self.animes_cache[anime_name]
+            size -= (len(animes) + 1) * self.ANIME_SIZE_ESTIMATE
+            evicted += 1
+        self.is_dirty = self.is_dirty or evicted > 0
+        return evicted
 
     def search_anime_by_name(self, anime_name: str, force_refresh: bool = False) -> List[Anime]:
         """
@@ -27,9 +58,12 @@ class Search:
         current_time = time.time()
 
         # no point in checking the cache if we need to force refresh
-        if not force_refresh and anime_name in self.animes_cache:
-            cache_time, cached_anime = self.animes_cache[anime_name]
-            if current_time - cache_time < self.CACHE_EXPIRATION_TIME.total_seconds():
+        if not force_refresh:
+            started_at = time.perf_counter()
+            cache_time, cached_anime = self.animes_cache.get(anime_name, (0.0, None))
+            is_hit = cached_anime is not None and current_time - cache_time < self.CACHE_EXPIRATION_TIME.total_seconds()
+            self.stats.record_lookup(is_hit, started_at)
+            if is_hit:
                 return cached_anime
 
         # perform search if not in cache or cache expired
@@ -37,6 +71,7 @@ class Search:
         animes = [Anime.from_search_result(self.provider, r) for r in results]
 
         self.animes_cache[anime_name] = (current_time, animes)
+        self.is_dirty = True
         return animes
 
     def get_episodes_by_anime(self, anime: Anime, lang: LanguageTypeEnum = LanguageTypeEnum.SUB) -> List[Episode]:
@@ -53,12 +88,12 @@ class Search:
         """
         Saves the cache to a file.
         """
+        self.is_dirty = False
         try:
-            with open(file=self.cache_file, mode="wb") as f:
-                pickle.dump({"animes_cache": self.animes_cache}, f)
-        except Exception as e:
-            print("Couldn't save cache.")
-            print(e)
+            write_atomic(self.cache_file, {"animes_cache": self.animes_cache})
+        except BaseException:
+            self.is_dirty = True
+            raise
 
     def load(self) -> None:
         """
@@ -1,5 +1,6 @@
 import curses
-from typing import List, Optional, Any
+import threading
+from typing import List, Optional, Any, Iterable, Callable
 
 
 class ListMenu:
@@ -104,6 +105,105 @@ class ListMenu:
         result = curses.wrapper(inner)
         return result
 
+    @staticmethod
+    def spawn_live(from_source: Iterable[Any], title: Optional[str] = None,
+                   sort_key: Optional[Callable[[Any], Any]] = None,
+                   on_close: Optional[Callable[[], None]] = None) -> Optional[Any]:
+        """
+        Same as spawn, but options keep coming in from the source (consumed on a background thread) while the menu is
+        open. Options are (re-)sorted with the sort key as they arrive, the selection sticks to the selected option.
+        on_close gets called when the menu closes, which is the moment to stop whatever is feeding the source.
+        """
+        arrived: List[Any] = []  # options the menu hasn't picked up yet
+        options_lock = threading.Lock()
+        source_exhausted = threading.Event()
+
+        def consume():
+            try:
+                for option in from_source:
+                    with options_lock:
+                        arrived.append(option)
+            finally:
+                source_exhausted.set()
+
+        def inner(stdscr):
+            stdscr.clear()
+
+            curses.curs_set(0)  # hide cursor
+            stdscr.keypad(True)  # enable keypad mode
+            stdscr.timeout(100)  # redraw while waiting for input, so new options show up
+            curses.start_color()  # enable color
+            curses.init_pair(1, curses.COLOR_BLACK, curses.COLOR_WHITE)
+            curses.init_pair(2, curses.COLOR_CYAN, curses.COLOR_BLACK)
+
+            max_y, max_x = stdscr.getmaxyx()
+            view_height = max_y - 2  # view height excluding title and bottom padding
+            start_idx = 0
+            current_row = 0
+            selected = None
+            visible_options: List[Any] = []
+
+            while True:
+                is_done = source_exhausted.is_set()
+                with options_lock:
+                    new_options = arrived[:]
+                    arrived.clear()
+                # only (re-)sorts when something came in, the list is mostly sorted already by then
+                if new_options:
+                    visible_options.extend(new_options)
+                    if sort_key:
+                        visible_options.sort(key=sort_key)
+
+                # keep the selection on the same option, even when it moved because of re-ranking
+                if selected is not None and (current_row >= len(visible_options) or
+                                             visible_options[current_row] is not selected):
+                    current_row = next((i for i, o in enumerate(visible_options) if o is selected), 0)
+                    start_idx = min(start_idx, current_row)
+                    start_idx = max(start_idx, current_row - view_height + 1)
+                selected = visible_options[current_row] if visible_options else None
+
+                stdscr.erase()
+                status = f"{len(visible_options)} found" + ("" if is_done else ", searching...")
+                stdscr.addstr(0, 0, f"{title} ({status})" if title else f"({status})", curses.color_pair(2))
+
+                end_idx = min(start_idx + view_height, len(visible_options))
+                for index in range(start_idx, end_idx):
+                    row_str = f"[{index + 1}] {str(visible_options[index])[:max_x - 8]}"
+                    if index == current_row:
+                        stdscr.addstr(index - start_idx + 1, 0, row_str, curses.color_pair(1))
+                    else:
+                        stdscr.addstr(index - start_idx + 1, 0, row_str)
+
+                stdscr.addstr(max_y - 1, 0, " Press 'q' to quit (stops searching).")
+                stdscr.refresh()
+
+                key = stdscr.getch()
+                if key == curses.KEY_UP and current_row > 0:
+                    current_row -= 1
+                    if current_row < start_idx:
+                        start_idx -= 1
+                elif key == curses.KEY_DOWN and current_row < len(visible_options) - 1:
+                    current_row += 1
+                    if current_row >= end_idx:
+                        start_idx += 1
+                elif key == ord('q'):
+                    return None
+                elif key == ord('\n') and selected is not None:
+                    return selected
+
+                if key in (curses.KEY_UP, curses.KEY_DOWN) and visible_options:
+                    selected = visible_options[current_row]
+
+        consumer = threading.Thread(target=consume, daemon=True)
+        consumer.start()
+        try:
+            return curses.wrapper(inner)
+        finally:
+            if on_close:
+                on_close()
+            # (the source should stop once closed, a source that doesn't is left to the daemon thread)
+            consumer.join(timeout=1.0)
+
 
 class SliderMenu:
     @staticmethod
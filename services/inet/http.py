@@ -0,0 +1,88 @@
+import threading
+from typing import Dict, Final, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HttpClient:
+    """
+    Shared HTTP client. Connections are kept alive in a pool per host, so repeated requests to the same host skip the
+    DNS/TCP/TLS setup. Requests always have a timeout and idempotent ones get retried with backoff.
+    """
+    DEFAULT_TIMEOUT: Final[Tuple[float, float]] = (3.05, 10.0)  # (connect, read)
+    RETRY_STATUSES: Final[Tuple[int, ...]] = (429, 500, 502, 503, 504)
+    DEFAULT_HEADERS: Final[Dict[str, str]] = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    }
+
+    def __init__(self, timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT, retries: int = 3,
+                 backoff_factor: float = 0.3, pool_connections: int = 10, pool_maxsize: int = 10):
+        self.timeout: Union[float, Tuple[float, float]] = timeout
+        self.retries: int = retries
+        self.backoff_factor: float = backoff_factor
+        self.pool_connections: int = pool_connections
+        self.pool_maxsize: int = pool_maxsize
+        self.__session: Optional[requests.Session] = None
+        self.__lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        # created on first use, so importing the services doesn't cost anything
+        if self.__session is None:
+            with self.__lock:
+                if self.__session is None:
+                    self.__session = self.__create_session()
+        return self.__session
+
+    def __create_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              max_retries=retry)
+
+        session = requests.Session()
+        session.headers.update(self.DEFAULT_HEADERS)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request over the pooled session.
+
+        :param method: The HTTP method.
+        :param url: The URL.
+        :param kwargs: Passed on to requests, a timeout is filled in when missing.
+        :return: The response.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request over the pooled session.
+
+        :param url: The URL.
+        :param kwargs: Passed on to requests, a timeout is filled in when missing.
+        :return: The response.
+        """
+        return self.request("GET", url, **kwargs)
+
+    def close(self) -> None:
+        """
+        Closes all pooled connections, the next request opens a new session.
+        """
+        with self.__lock:
+            if self.__session is not None:
+                self.__session.close()
+                self.__session = None
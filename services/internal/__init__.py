@@ -10,6 +10,10 @@ class SerializedEncoder(json.JSONEncoder):
             return {k: v for k, v in obj.__dict__.items() if
                     not k.startswith("_") and not isinstance(v, (property, RLock))}
 
+        # same goes for objects that use __slots__ instead
+        if hasattr(obj, "__slots__"):
+            return {k: getattr(obj, k, None) for k in obj.__slots__ if not k.startswith("_")}
+
         # handle sets by converting them to lists
         if isinstance(obj, set) or isinstance(obj, frozenset):
             return list(obj)
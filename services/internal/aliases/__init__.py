@@ -0,0 +1,59 @@
+import copy
+import os
+import pickle
+from typing import Dict, Final, List
+
+from ..caching import CacheStats, ManagedCache
+from ..store import write_atomic
+
+
+class AliasManager(ManagedCache):
+    ALIAS_SIZE_ESTIMATE: Final[int] = 60
+
+    def __init__(self, config_dir: str):
+        self.config_dir: Final[str] = config_dir
+        self.alias_file: Final[str] = os.path.join(config_dir, "alias.map")
+        # command -> its aliases
+        self.alias_map: Dict[str, List[str]] = {}
+        # the map is changed directly (by the alias command), changes are found by comparing it with what was saved
+        self.saved_alias_map: Dict[str, List[str]] = {}
+        self.stats: CacheStats = CacheStats()
+
+    def add_commands(self, commands: List[str]) -> None:
+        """
+        Makes sure every command has an entry in the alias map.
+
+        :param commands: The commands.
+        """
+        for command in commands:
+            self.alias_map.setdefault(command, [])
+
+    def entry_count(self) -> int:
+        return sum(len(aliases) for aliases in self.alias_map.values())
+
+    def memory_size(self) -> int:
+        return (len(self.alias_map) + self.entry_count()) * self.ALIAS_SIZE_ESTIMATE
+
+    def disk_size(self) -> int:
+        return self.file_size(self.alias_file)
+
+    def has_changes(self) -> bool:
+        return self.alias_map != self.saved_alias_map
+
+    def save(self) -> None:
+        alias_map = copy.deepcopy(self.alias_map)
+        write_atomic(self.alias_file, {"alias_map": alias_map})
+        self.saved_alias_map = alias_map
+
+    def load(self) -> None:
+        if not os.path.exists(self.alias_file) or os.path.getsize(self.alias_file) == 0:
+            return
+
+        with open(file=self.alias_file, mode="rb") as f:
+            alias_map = pickle.load(f).get("alias_map", {})
+        # merged in place: the map is shared with whoever asked for it before loading, and it might have changed since
+        # (loading happens in the background)
+        for command, aliases in alias_map.items():
+            current = self.alias_map.setdefault(command, [])
+            current[:0] = [alias for alias in aliases if alias not in current]
+        self.saved_alias_map = alias_map
@@ -0,0 +1,387 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+from typing import Callable, Dict, Final, Iterator, List, Optional
+
+
+class CacheStats:
+    __slots__ = ("hits", "misses", "evictions", "lookups", "lookup_seconds", "load_seconds", "save_seconds",
+                 "save_errors")
+
+    def __init__(self):
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.lookups: int = 0
+        self.lookup_seconds: float = 0.0
+        self.load_seconds: float = 0.0
+        self.save_seconds: float = 0.0
+        self.save_errors: int = 0
+
+    def record_lookup(self, hit: bool, started_at: float) -> None:
+        """
+        Records a single lookup.
+
+        :param hit: If the lookup was a hit.
+        :param started_at: The time.perf_counter() of when the lookup started.
+        """
+        self.lookup_seconds += time.perf_counter() - started_at
+        self.lookups += 1
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    @property
+    def hit_ratio(self) -> Optional[float]:
+        return self.hits / self.lookups if self.lookups else None
+
+    @property
+    def average_lookup_seconds(self) -> Optional[float]:
+        return self.lookup_seconds / self.lookups if self.lookups else None
+
+
+class ManagedCache(ABC):
+    """
+    What a cache has to offer to be registered with the cache manager. Sizes are estimates, they're meant to compare
+    caches with each other (and to enforce limits), not to be exact.
+    """
+    stats: CacheStats
+
+    @abstractmethod
+    def entry_count(self) -> int:
+        pass
+
+    @abstractmethod
+    def memory_size(self) -> int:
+        """
+        :return: The estimated amount of bytes the cache takes up in memory.
+        """
+        pass
+
+    def disk_size(self) -> int:
+        """
+        :return: The amount of bytes the cache takes up on disk.
+        """
+        return 0
+
+    def has_changes(self) -> bool:
+        """
+        :return: If the cache changed since it was last saved (or loaded), caches that can't tell are always saved.
+        """
+        return True
+
+    def evict(self, max_memory: int) -> int:
+        """
+        Evicts (least recently used) entries until the cache fits in the given amount of memory.
+
+        :param max_memory: The amount of bytes the cache may take up in memory.
+        :return: The amount of entries that were evicted.
+        """
+        return 0
+
+    @abstractmethod
+    def load(self) -> None:
+        pass
+
+    @abstractmethod
+    def save(self) -> None:
+        pass
+
+    @staticmethod
+    def file_size(*files: str) -> int:
+        size = 0
+        for file in files:
+            try:
+                size += os.path.getsize(file)
+            except OSError:
+                continue
+        return size
+
+
+class CacheLimits:
+    __slots__ = ("max_memory", "max_disk")
+
+    def __init__(self, max_memory: Optional[int] = None, max_disk: Optional[int] = None):
+        self.max_memory: Optional[int] = max_memory
+        self.max_disk: Optional[int] = max_disk
+
+
+class CacheManager:
+    """
+    Registry of all caches: loads and saves them (timing both), enforces their limits and reports on them.
+    """
+    MAX_LOAD_WORKERS: Final[int] = 8
+
+    def __init__(self):
+        self.caches: Dict[str, ManagedCache] = {}
+        self.limits: Dict[str, CacheLimits] = {}
+        # caches registered after everything got loaded (services that are created on first use) load right away
+        self.is_loaded: bool = False
+        # caches that are (or were) loading in the background
+        self.loading: Dict[str, Future] = {}
+        self.__lock = threading.Lock()
+
+    def register(self, name: str, cache: ManagedCache, max_memory: Optional[int] = None,
+                 max_disk: Optional[int] = None) -> ManagedCache:
+        """
+        Registers a cache.
+
+        :param name: The name of the cache, e.g. 'ls.hashes'.
+        :param cache: The cache.
+        :param max_memory: The amount of bytes the cache may take up in memory (None for unlimited).
+        :param max_disk: The amount of bytes the cache may take up on disk (None for unlimited).
+        :return: The cache.
+        """
+        self.caches[name] = cache
+        self.limits[name] = CacheLimits(max_memory, max_disk)
+        if self.is_loaded:
+            self.__try(self.load, name, "load")
+        return cache
+
+    def unregister(self, name: str) -> None:
+        self.caches.pop(name, None)
+        self.limits.pop(name, None)
+
+    @contextmanager
+    def __timed(self, cache: ManagedCache, stage: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(cache.stats, f"{stage}_seconds", time.perf_counter() - started_at)
+
+    def load(self, name: str) -> None:
+        cache = self.caches[name]
+        with self.__timed(cache, "load"):
+            cache.load()
+
+    def save(self, name: str, only_changed: bool = False) -> bool:
+        """
+        Saves a cache, after enforcing its limits.
+
+        :param name: The name of the cache.
+        :param only_changed: Skips the cache if it didn't change since it was last saved.
+        :return: If the cache was saved.
+        """
+        # saving a cache that's still loading would overwrite the file with whatever was there before loading
+        self.wait_for(name)
+        cache = self.caches[name]
+        self.enforce_limits(name)
+        if only_changed and not cache.has_changes():
+            return False
+
+        with self.__timed(cache, "save"):
+            cache.save()
+        return True
+
+    def load_all(self) -> None:
+        self.is_loaded = True
+        for name in list(self.caches):
+            self.__try(self.load, name, "load")
+
+    def load_all_in_background(self) -> None:
+        """
+        Loads every cache in parallel, on a thread pool. Use wait_for before using a cache that might still be loading.
+        """
+        with self.__lock:
+            self.is_loaded = True
+            names = [name for name in self.caches if name not in self.loading]
+            if not names:
+                return
+
+            executor = ThreadPoolExecutor(max_workers=min(len(names), self.MAX_LOAD_WORKERS),
+                                          thread_name_prefix="cache-load")
+            for name in names:
+                self.loading[name] = executor.submit(self.__try, self.load, name, "load")
+            # the workers exit once everything is loaded
+            executor.shutdown(wait=False)
+
+    def wait_for(self, *patterns: str) -> None:
+        """
+        Blocks until the caches are loaded, caches that aren't loading in the background don't block.
+
+        :param patterns: The names of the caches, wildcards are supported (e.g. 'ls.*', '*' for all of them).
+        """
+        with self.__lock:
+            futures = [future for name, future in self.loading.items()
+                       if any(fnmatchcase(name, pattern) for pattern in patterns)]
+        wait(futures)
+
+    def save_all(self) -> None:
+        """
+        Saves every cache that changed.
+        """
+        for name in list(self.caches):
+            self.__try(lambda _name: self.save(_name, only_changed=True), name, "save")
+
+    def flush(self) -> List[str]:
+        """
+        Saves the caches that changed, skipping the ones that are still loading. Meant to run in the background, so
+        nothing is printed: failures are counted (see CacheStats.save_errors), caches that fail to save stay changed
+        and are retried on the next flush.
+
+        :return: The names of the caches that were saved.
+        """
+        with self.__lock:
+            loading = {name for name, future in self.loading.items() if not future.done()}
+
+        saved = []
+        for name in list(self.caches):
+            if name in loading:
+                continue
+            try:
+                if self.save(name, only_changed=True):
+                    saved.append(name)
+            except Exception:
+                self.caches[name].stats.save_errors += 1
+        return saved
+
+    @staticmethod
+    def __try(action: Callable[[str], None], name: str, verb: str) -> None:
+        try:
+            action(name)
+        except Exception as e:
+            print(f"Couldn't {verb} cache '{name}'.")
+            print(e)
+
+    def enforce_limits(self, name: Optional[str] = None) -> int:
+        """
+        Evicts entries from the caches that exceed their limits. Disk limits are enforced through memory, assuming the
+        size on disk is proportional to the size in memory.
+
+        :param name: The cache to enforce the limits of, None for all caches.
+        :return: The amount of entries that were evicted.
+        """
+        evicted = 0
+        for cache_name in ([name] if name is not None else list(self.caches)):
+            cache = self.caches[cache_name]
+            limits = self.limits[cache_name]
+
+            max_memory = limits.max_memory
+            if limits.max_disk is not None:
+                disk_size = cache.disk_size()
+                if disk_size > limits.max_disk:
+                    target = int(cache.memory_size() * limits.max_disk / disk_size)
+                    max_memory = target if max_memory is None else min(max_memory, target)
+
+            if max_memory is not None and cache.memory_size() > max_memory:
+                count = cache.evict(max_memory)
+                cache.stats.evictions += count
+                evicted += count
+        return evicted
+
+    def report(self) -> List[Dict[str, object]]:
+        """
+        Gets the current numbers of every cache.
+
+        :return: A row (dict) per cache.
+        """
+        rows = []
+        for name, cache in self.caches.items():
+            limits = self.limits[name]
+            stats = cache.stats
+            rows.append({
+                "cache": name,
+                "entries": cache.entry_count(),
+                "memory": cache.memory_size(),
+                "max_memory": limits.max_memory,
+                "disk": cache.disk_size(),
+                "max_disk": limits.max_disk,
+                "hits": stats.hits,
+                "misses": stats.misses,
+                "hit_ratio": stats.hit_ratio,
+                "avg_lookup_seconds": stats.average_lookup_seconds,
+                "load_seconds": stats.load_seconds,
+                "save_seconds": stats.save_seconds,
+                "evictions": stats.evictions,
+                "save_errors": stats.save_errors,
+            })
+        return rows
+
+
+class WriteBehind:
+    """
+    Saves the caches that changed in the background, so a crash doesn't lose them and exiting only has to save what
+    changed since. Saving is debounced: it happens once nothing was scheduled for `delay` seconds (but no later than
+    `max_delay` seconds after the first schedule), and never while a command is running (see paused).
+    """
+    DEFAULT_DELAY: Final[float] = 2.0
+    DEFAULT_MAX_DELAY: Final[float] = 30.0
+
+    def __init__(self, manager: CacheManager, delay: float = DEFAULT_DELAY, max_delay: float = DEFAULT_MAX_DELAY):
+        self.manager: Final[CacheManager] = manager
+        self.delay: float = delay
+        self.max_delay: float = max_delay
+        self.__condition = threading.Condition()
+        self.__first_scheduled_at: Optional[float] = None
+        self.__due_at: Optional[float] = None
+        self.__pauses: int = 0
+        self.__is_running: bool = False
+        self.__thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self.__condition:
+            if self.__is_running:
+                return
+            self.__is_running = True
+            self.__thread = threading.Thread(target=self.__run, name="write-behind", daemon=True)
+            self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background thread, without saving whatever is still scheduled (that's up to the caller).
+        """
+        with self.__condition:
+            self.__is_running = False
+            self.__condition.notify_all()
+            thread, self.__thread = self.__thread, None
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def schedule(self) -> None:
+        """
+        Schedules the changed caches to be saved, postponing an already scheduled save (up to max_delay).
+        """
+        with self.__condition:
+            now = time.monotonic()
+            if self.__first_scheduled_at is None:
+                self.__first_scheduled_at = now
+            self.__due_at = min(now + self.delay, self.__first_scheduled_at + self.max_delay)
+            self.__condition.notify_all()
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """
+        Holds off saving while in this context, waits for a save that's in progress to finish first.
+        """
+        with self.__condition:
+            self.__pauses += 1
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__pauses -= 1
+                self.__condition.notify_all()
+
+    def __run(self) -> None:
+        with self.__condition:
+            while True:
+                while self.__is_running and (self.__due_at is None or self.__pauses or
+                                             time.monotonic() < self.__due_at):
+                    timeout = None
+                    if self.__due_at is not None and not self.__pauses:
+                        timeout = max(0.0, self.__due_at - time.monotonic())
+                    self.__condition.wait(timeout)
+
+                if not self.__is_running:
+                    return
+
+                self.__first_scheduled_at = self.__due_at = None
+                # saves while holding the condition, so commands (see paused) wait for it to finish
+                self.manager.flush()
@@ -31,4 +31,15 @@ class Config:
         self.config["DEFAULT"] = {
             "search_threshold": "50",
             "display_intro": "yes",
+            "hash_workers": "0",
+            "hash_with_processes": "no",
+            "search_workers": "0",
+            "search_max_depth": "-1",
+            "search_max_results": "0",
+            "search_exclude": ".git node_modules __pycache__ $RECYCLE.BIN",
+            "content_search_workers": "0",
+            "content_search_with_processes": "auto",
+            "content_search_max_file_size_mb": "50",
+            "web_search_engines": "ddg bing mojeek",
+            "web_search_deadline": "3.0",
         }
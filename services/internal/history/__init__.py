@@ -1,8 +1,12 @@
 import os
 import pickle
+import threading
 from datetime import datetime
 from typing import List, Final
 
+from ..caching import CacheStats, ManagedCache
+from ..store import write_atomic
+
 
 class Record:
     def __init__(self, timestamp: datetime, command: str, subcommands: List[str]):
@@ -14,12 +18,38 @@ class Record:
         return f"{self.timestamp} @ {self.command.center(32)} & [{' '.join(self.subcommands)}]"
 
 
-class HistoryManager:
+class HistoryManager(ManagedCache):
+    RECORD_SIZE_ESTIMATE: Final[int] = 200
+
     def __init__(self, cache_dir: str):
         self.cache_dir: Final[str] = cache_dir
         self.cache_file: Final[str] = f"{cache_dir}/cmd.history"
         self.history: List[Record] = []
         self.is_tracking: bool = True
+        # the history is only ever appended to, there are no lookups to count
+        self.stats: CacheStats = CacheStats()
+        self.is_dirty: bool = False
+        self.__lock = threading.Lock()
+
+    def entry_count(self) -> int:
+        return len(self.history)
+
+    def memory_size(self) -> int:
+        return len(self.history) * self.RECORD_SIZE_ESTIMATE
+
+    def disk_size(self) -> int:
+        return self.file_size(self.cache_file)
+
+    def has_changes(self) -> bool:
+        return self.is_dirty
+
+    def evict(self, max_memory: int) -> int:
+        # forget the oldest records
+        with self.__lock:
+            evicted = max(0, len(self.history) - max_memory // self.RECORD_SIZE_ESTIMATE)
+            del self.history[:evicted]
+            self.is_dirty = self.is_dirty or evicted > 0
+        return evicted
 
     def record_line(self, line: str) -> None:
         if not self.is_tracking or not line.strip():
@@ -29,20 +59,31 @@ class HistoryManager:
         command = parts[0]
         subcommands = parts[1:]
 
-        self.history.append(Record(datetime.now(), command, subcommands))
+        with self.__lock:
+            self.history.append(Record(datetime.now(), command, subcommands))
+            self.is_dirty = True
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.history = []
+            self.is_dirty = True
 
-    def save(self) -> bool:
+    def save(self) -> None:
+        with self.__lock:
+            history = list(self.history)
+            self.is_dirty = False
         try:
-            with open(file=self.cache_file, mode="wb") as f:
-                pickle.dump({"history": self.history}, f)
-        except Exception as e:
-            return False
-        return True
+            write_atomic(self.cache_file, {"history": history})
+        except BaseException:
+            self.is_dirty = True
+            raise
 
     def load(self) -> bool:
         if os.path.exists(self.cache_file):
             with open(file=self.cache_file, mode="rb") as f:
                 cache_data = pickle.load(f)
-                self.history = cache_data.get("history", {})
+            # (loading happens in the background, lines might have been recorded already)
+            with self.__lock:
+                self.history = cache_data.get("history", []) + self.history
             return True
         return False
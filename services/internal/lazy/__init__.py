@@ -0,0 +1,165 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Final, Iterator, List, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class StartupTimer:
+    """
+    Keeps track of where the time until the first prompt goes: the startup stages and the services that got loaded
+    (on first use) along the way.
+    """
+
+    def __init__(self):
+        self.created_at: Final[float] = time.time()
+        self.process_started_at: Final[float] = self.__process_start_time() or self.created_at
+        self.stages: Dict[str, float] = {}
+        # service -> (seconds it took to load, if it was loaded before the first prompt)
+        self.services: Dict[str, Tuple[float, bool]] = {}
+        self.time_to_prompt: Optional[float] = None
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def __process_start_time() -> Optional[float]:
+        if psutil is None:
+            return None
+        try:
+            return psutil.Process().create_time()
+        except psutil.Error:
+            return None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Times a startup stage, stages that run multiple times (e.g. after a reload) keep their last time.
+
+        :param name: The name of the stage.
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - started_at)
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        with self.__lock:
+            self.stages[name] = seconds
+
+    def record_service(self, name: str, seconds: float) -> None:
+        with self.__lock:
+            self.services[name] = (seconds, self.time_to_prompt is None)
+
+    def mark_prompt(self) -> None:
+        """
+        Marks the first prompt being shown, only the first call counts.
+        """
+        with self.__lock:
+            if self.time_to_prompt is None:
+                self.time_to_prompt = time.time() - self.process_started_at
+
+    def report(self) -> List[Tuple[str, str, float]]:
+        """
+        Gets the timings.
+
+        :return: A list of (kind, name, seconds) tuples, kind being 'stage', 'service' or 'total'.
+        """
+        with self.__lock:
+            rows = [("stage", name, seconds) for name, seconds in self.stages.items()]
+            rows += [("service", f"{name} (before prompt)" if before_prompt else name, seconds)
+                     for name, (seconds, before_prompt) in self.services.items()]
+            if self.time_to_prompt is not None:
+                rows.append(("total", "time to first prompt", self.time_to_prompt))
+        return rows
+
+
+class LazyProxy:
+    """
+    Stands in for a service that's expensive to create, mostly because of what it imports. The service is created on
+    first use (attribute access), everything is forwarded to it from then on.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], timer: Optional[StartupTimer] = None):
+        # attributes are set on the proxy itself, setting them normally would forward them to the service
+        object.__setattr__(self, "_LazyProxy__name", name)
+        object.__setattr__(self, "_LazyProxy__factory", factory)
+        object.__setattr__(self, "_LazyProxy__timer", timer)
+        object.__setattr__(self, "_LazyProxy__target", None)
+        object.__setattr__(self, "_LazyProxy__is_loaded", False)
+        object.__setattr__(self, "_LazyProxy__callbacks", [])
+        object.__setattr__(self, "_LazyProxy__lock", threading.RLock())
+
+    def _resolve(self) -> Any:
+        if self.__is_loaded:
+            return self.__target
+
+        with self.__lock:
+            if not self.__is_loaded:
+                started_at = time.perf_counter()
+                target = self.__factory()
+                object.__setattr__(self, "_LazyProxy__target", target)
+                object.__setattr__(self, "_LazyProxy__is_loaded", True)
+                if self.__timer is not None:
+                    self.__timer.record_service(self.__name, time.perf_counter() - started_at)
+
+                for callback in self.__callbacks:
+                    callback(target)
+                self.__callbacks.clear()
+        return self.__target
+
+    def _is_loaded(self) -> bool:
+        return self.__is_loaded
+
+    def _when_loaded(self, callback: Callable[[Any], None]) -> None:
+        with self.__lock:
+            if not self.__is_loaded:
+                self.__callbacks.append(callback)
+                return
+        callback(self.__target)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._resolve(), name)
+
+    def __repr__(self) -> str:
+        return repr(self.__target) if self.__is_loaded else f"<lazy {self.__name}>"
+
+
+def resolve(service: Any) -> Any:
+    """
+    Gets the actual service behind a proxy, creating it if it wasn't yet.
+
+    :param service: A proxy, or a service (which is returned as is).
+    :return: The service.
+    """
+    return service._resolve() if isinstance(service, LazyProxy) else service
+
+
+def is_loaded(service: Any) -> bool:
+    """
+    :param service: A proxy, or a service (which is always loaded).
+    :return: If the service was created already, without creating it.
+    """
+    return service._is_loaded() if isinstance(service, LazyProxy) else True
+
+
+def when_loaded(service: Any, callback: Callable[[Any], None]) -> None:
+    """
+    Runs a callback once the service gets created, right away if it already was.
+
+    :param service: A proxy, or a service.
+    :param callback: Gets the service.
+    """
+    if isinstance(service, LazyProxy):
+        service._when_loaded(callback)
+    else:
+        callback(service)
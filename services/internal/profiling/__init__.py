@@ -0,0 +1,250 @@
+import cProfile
+import importlib.abc
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from types import ModuleType
+from typing import Any, Dict, Final, Iterator, List, Optional, Sequence, Tuple
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Times how long importing our own modules takes (including whatever they import in turn), by wrapping their
+    loaders. Only modules of the given top level packages are timed, everything else is left alone.
+    """
+
+    def __init__(self, packages: Sequence[str]):
+        self.packages: Final[Tuple[str, ...]] = tuple(packages)
+        # module -> (seconds including its imports, seconds of the module itself), in the order they were imported
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self.__local = threading.local()
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname.split(".")[0] not in self.packages:
+            return None
+
+        # find the spec the way it would've been found without us
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        # nested imports are subtracted from the module's own time
+        stack = getattr(self.__local, "stack", None)
+        if stack is None:
+            stack = self.__local.stack = []
+
+        stack.append(0.0)
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started_at
+            nested_seconds = stack.pop()
+            if stack:
+                stack[-1] += seconds
+            self.timings[name] = (seconds, seconds - nested_seconds)
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader: importlib.abc.Loader, timer: ImportTimer):
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module: ModuleType) -> None:
+        with self.timer.timed(module.__name__):
+            self.loader.exec_module(module)
+
+    def __getattr__(self, name: str) -> Any:
+        # get_source, get_filename, is_package, ...
+        return getattr(self.loader, name)
+
+
+class CommandTiming:
+    __slots__ = ("count", "wall_seconds", "cpu_seconds", "max_wall_seconds", "peak_memory")
+
+    def __init__(self):
+        self.count: int = 0
+        self.wall_seconds: float = 0.0
+        self.cpu_seconds: float = 0.0
+        self.max_wall_seconds: float = 0.0
+        # only known while memory is being traced
+        self.peak_memory: Optional[int] = None
+
+
+class Profiler:
+    """
+    Collects where time goes: imports (see ImportTimer), stages (e.g. postloop) and every command. Commands are always
+    timed (wall and CPU time), cProfile and tracemalloc only capture while turned on, as they slow everything down.
+    """
+    TOP_FUNCTIONS: Final[int] = 50
+    TOP_ALLOCATIONS: Final[int] = 25
+
+    def __init__(self, dump_dir: str, import_timer: Optional[ImportTimer] = None):
+        self.dump_dir: Final[str] = dump_dir
+        self.import_timer: Optional[ImportTimer] = import_timer
+        self.stages: Dict[str, float] = {}
+        self.commands: Dict[str, CommandTiming] = {}
+        self.cprofile: Optional[cProfile.Profile] = None
+        self.is_tracing_memory: bool = False
+        self.capture_started_at: Optional[float] = None
+
+    @property
+    def is_capturing(self) -> bool:
+        return self.cprofile is not None or self.is_tracing_memory
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - started_at
+
+    @contextmanager
+    def command(self, name: str) -> Iterator[None]:
+        """
+        Times a command, and captures it when capturing is turned on.
+
+        :param name: The name of the command.
+        """
+        if self.is_tracing_memory:
+            tracemalloc.reset_peak()
+        cprofile = self.cprofile
+
+        started_at = time.perf_counter()
+        cpu_started_at = time.process_time()
+        if cprofile is not None:
+            cprofile.enable()
+        try:
+            yield
+        finally:
+            if cprofile is not None:
+                cprofile.disable()
+            wall_seconds = time.perf_counter() - started_at
+
+            timing = self.commands.get(name)
+            if timing is None:
+                timing = self.commands[name] = CommandTiming()
+            timing.count += 1
+            timing.wall_seconds += wall_seconds
+            timing.cpu_seconds += time.process_time() - cpu_started_at
+            timing.max_wall_seconds = max(timing.max_wall_seconds, wall_seconds)
+            if self.is_tracing_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                timing.peak_memory = max(timing.peak_memory or 0, peak)
+
+    def start_capture(self, cpu: bool = True, memory: bool = True) -> None:
+        """
+        Starts capturing commands.
+
+        :param cpu: Captures the function calls of commands with cProfile.
+        :param memory: Traces memory allocations with tracemalloc.
+        """
+        if cpu and self.cprofile is None:
+            self.cprofile = cProfile.Profile()
+        if memory and not self.is_tracing_memory:
+            tracemalloc.start()
+            self.is_tracing_memory = True
+        self.capture_started_at = time.time()
+
+    def stop_capture(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Stops capturing.
+
+        :param extra: Additional sections to include in the report.
+        :return: The report, including what was captured.
+        """
+        report = self.report(extra)
+        self.cprofile = None
+        if self.is_tracing_memory:
+            tracemalloc.stop()
+            self.is_tracing_memory = False
+        self.capture_started_at = None
+        return report
+
+    def report(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Gets everything collected so far, in a JSON serializable form.
+
+        :param extra: Additional sections to include (e.g. cache statistics).
+        :return: The report.
+        """
+        imports = self.import_timer.timings if self.import_timer is not None else {}
+        report: Dict[str, Any] = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "imports": [
+                {"module": module, "seconds": seconds, "self_seconds": self_seconds}
+                for module, (seconds, self_seconds) in list(imports.items())
+            ],
+            "stages": dict(self.stages),
+            "commands": [
+                {"command": name, "count": timing.count, "wall_seconds": timing.wall_seconds,
+                 "cpu_seconds": timing.cpu_seconds, "max_wall_seconds": timing.max_wall_seconds,
+                 "peak_memory": timing.peak_memory}
+                for name, timing in sorted(self.commands.items(), key=lambda item: -item[1].wall_seconds)
+            ],
+        }
+        if self.cprofile is not None:
+            report["functions"] = self.__top_functions(self.cprofile)
+        if self.is_tracing_memory:
+            report["allocations"] = self.__top_allocations()
+        report.update(extra or {})
+        return report
+
+    def __top_functions(self, cprofile: cProfile.Profile) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(cprofile)
+        if not stats.stats:
+            return []
+
+        rows = []
+        for (file, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({"function": f"{file}:{line}({function})", "calls": calls, "total_seconds": total,
+                         "cumulative_seconds": cumulative})
+        rows.sort(key=lambda row: -row["cumulative_seconds"])
+        return rows[:self.TOP_FUNCTIONS]
+
+    def __top_allocations(self) -> List[Dict[str, Any]]:
+        statistics = tracemalloc.take_snapshot().statistics("lineno")
+        return [{"location": str(statistic.traceback), "size": statistic.size, "count": statistic.count}
+                for statistic in statistics[:self.TOP_ALLOCATIONS]]
+
+    def dump(self, report: Dict[str, Any]) -> str:
+        """
+        Writes a report to the dump directory.
+
+        :param report: The report (see report).
+        :return: The file the report was written to.
+        """
+        os.makedirs(self.dump_dir, exist_ok=True)
+        dump_file = os.path.join(self.dump_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}.json")
+        with open(file=dump_file, mode="w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return dump_file
@@ -0,0 +1,199 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Final, IO, Optional
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def write_atomic(file: str, data: Any) -> None:
+    """
+    Pickles data to a file. It's written to a temporary file first, which then replaces the actual file in one go, so
+    readers (and crashes) never end up with a half-written file.
+
+    :param file: The file.
+    :param data: The data, has to be picklable.
+    """
+    directory = os.path.dirname(file) or "."
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_file = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file)}.", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+class FileLock:
+    """
+    Inter-process lock on a file (msvcrt on Windows, flock everywhere else). Only guards against other instances that
+    use the same lock, it doesn't stop anything else from touching the file.
+    """
+    RETRY_INTERVAL: Final[float] = 0.05
+
+    def __init__(self, lock_file: str, timeout: float = 10.0):
+        self.lock_file: Final[str] = lock_file
+        self.timeout: float = timeout
+        self.__handle: Optional[IO] = None
+        # the file lock is per process, threads of the same process have to take turns too
+        self.__thread_lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.__thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Couldn't lock '{self.lock_file}' within {self.timeout} seconds.")
+        try:
+            self.__acquire_file_lock()
+        except BaseException:
+            self.__thread_lock.release()
+            raise
+
+    def __acquire_file_lock(self) -> None:
+        os.makedirs(os.path.dirname(self.lock_file) or ".", exist_ok=True)
+        handle = open(self.lock_file, "a+b")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if msvcrt is not None:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                elif fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    handle.close()
+                    raise TimeoutError(f"Couldn't lock '{self.lock_file}' within {self.timeout} seconds.")
+                time.sleep(self.RETRY_INTERVAL)
+        self.__handle = handle
+
+    def release(self) -> None:
+        if self.__handle is None:
+            return
+        try:
+            if msvcrt is not None:
+                self.__handle.seek(0)
+                msvcrt.locking(self.__handle.fileno(), msvcrt.LK_UNLCK, 1)
+            elif fcntl is not None:
+                fcntl.flock(self.__handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.__handle.close()
+            self.__handle = None
+            self.__thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.release()
+
+
+class CacheNamespace:
+    """
+    A single cache file of the store. Writes are atomic (see write_atomic), so readers don't need the lock.
+    """
+
+    def __init__(self, store_dir: str, name: str):
+        self.name: Final[str] = name
+        self.cache_file: Final[str] = os.path.join(store_dir, *name.split("/")) + ".cache"
+        self.lock: Final[FileLock] = FileLock(f"{self.cache_file}.lock")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.cache_file)
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.cache_file)
+        except OSError:
+            return 0
+
+    def read(self, default: Any = None) -> Any:
+        """
+        Reads the contents of the namespace.
+
+        :param default: What gets returned when there's nothing stored (yet) or the file is unreadable.
+        :return: The stored data.
+        """
+        try:
+            with open(file=self.cache_file, mode="rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return default
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # corrupt or from an incompatible version, start over
+            return default
+
+    def write(self, data: Any) -> None:
+        """
+        Replaces the contents of the namespace.
+
+        :param data: The data to store, has to be picklable.
+        """
+        with self.lock:
+            write_atomic(self.cache_file, data)
+
+    def update(self, merge: Callable[[Any], Any], default: Any = None) -> Any:
+        """
+        Read-modify-write of the namespace while holding the lock, so concurrent instances don't overwrite each other's
+        changes.
+
+        :param merge: Gets the currently stored data (or the default), returns the data to store.
+        :param default: What merge gets when nothing is stored yet.
+        :return: The data that got stored.
+        """
+        with self.lock:
+            data = merge(self.read(default))
+            write_atomic(self.cache_file, data)
+        return data
+
+
+class CacheStore:
+    """
+    Hands out cache namespaces, every namespace being its own file below the store directory.
+    Namespaces can be nested with slashes (e.g. 'search/ddg' is stored at 'search/ddg.cache').
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir: Final[str] = store_dir
+        self.namespaces: Dict[str, CacheNamespace] = {}
+
+    def namespace(self, name: str) -> CacheNamespace:
+        """
+        Gets a namespace of the store, nothing is read until it's used.
+
+        :param name: The name of the namespace.
+        :return: The namespace.
+        """
+        namespace = self.namespaces.get(name)
+        if namespace is None:
+            namespace = CacheNamespace(self.store_dir, name)
+            self.namespaces[name] = namespace
+        return namespace
+
+    def namespaces_in(self, group: str) -> Dict[str, CacheNamespace]:
+        """
+        Gets all namespaces that are stored below a group (e.g. 'search'), including ones that weren't used yet.
+
+        :param group: The group.
+        :return: The namespaces by name.
+        """
+        directory = os.path.join(self.store_dir, *group.split("/"))
+        if not os.path.isdir(directory):
+            return {}
+
+        names = sorted(os.path.splitext(file)[0] for file in os.listdir(directory) if file.endswith(".cache"))
+        return {name: self.namespace(f"{group}/{name}") for name in names}
@@ -1,15 +1,14 @@
 from typing import List, Optional, Tuple
 
 import psutil
-import serial.tools.list_ports
 from colorama import Fore
-from pycaw.api.audioclient import ISimpleAudioVolume
-from pycaw.utils import AudioUtilities
 
 
 class COMService:
     @property
     def connections(self):
+        import serial.tools.list_ports
+
         ports = []
         for port, desc, hwid in sorted(serial.tools.list_ports.comports()):
             ports.append(f"{port}: {desc} [{hwid}]")
@@ -79,9 +78,13 @@ class ProcessManager:
 
 
 class AudioService:
+    # pycaw pulls in comtypes, it's only imported once the volume is actually touched
     @staticmethod
     def set_volume_to(new_volume_level: int) -> None:
         try:
+            from pycaw.api.audioclient import ISimpleAudioVolume
+            from pycaw.utils import AudioUtilities
+
             sessions = AudioUtilities.GetAllSessions()
             for session in sessions:
                 volume = session._ctl.QueryInterface(ISimpleAudioVolume)
@@ -92,6 +95,9 @@ class AudioService:
     @staticmethod
     def get_volume() -> Optional[int]:
         try:
+            from pycaw.api.audioclient import ISimpleAudioVolume
+            from pycaw.utils import AudioUtilities
+
             sessions = AudioUtilities.GetAllSessions()
             for session in sessions:
                 volume = session._ctl.QueryInterface(ISimpleAudioVolume)
@@ -0,0 +1,324 @@
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Final, List, Optional, Tuple, Dict, Set, Iterable, TYPE_CHECKING
+
+from ..internal.caching import CacheStats, ManagedCache
+
+if TYPE_CHECKING:
+    from .fs import File
+
+
+class DirectoryListing:
+    def __init__(self, signature: Tuple[int, int], files: List["File"], directories: List[str]):
+        self.signature: Tuple[int, int] = signature
+        self.files: List["File"] = files
+        self.directories: List[str] = directories
+        self.size_estimate: int = DirectoryListing.estimate_size(files, directories)
+
+    @staticmethod
+    def estimate_size(files: List["File"], directories: List[str]) -> int:
+        """
+        Roughly estimates how much memory a listing occupies, good enough for eviction decisions.
+
+        :param files: The files of the listing.
+        :param directories: The directories of the listing.
+        :return: Estimated amount of bytes.
+        """
+        file_overhead = 150  # (slotted) File object + its size, timestamp & hash
+        return sys.getsizeof(files) + sys.getsizeof(directories) + \
+            sum(sys.getsizeof(file.name) + file_overhead for file in files) + \
+            sum(sys.getsizeof(directory) for directory in directories)
+
+
+class ListingStore:
+    DEFAULT_MAX_ROWS: Final[int] = 250_000
+
+    def __init__(self, store_file: str, max_rows: int = DEFAULT_MAX_ROWS):
+        self.store_file: Final[str] = store_file
+        self.max_rows: int = max_rows
+        self.__connection: Optional[sqlite3.Connection] = None
+        self.__lock: threading.Lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # connects lazily, so startup doesn't have to touch the disk at all
+        if self.__connection is None:
+            self.__connection = sqlite3.connect(self.store_file, check_same_thread=False)
+            self.__connection.execute("PRAGMA synchronous=NORMAL")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS listings (directory TEXT PRIMARY KEY, saved_at REAL, payload BLOB)"
+            )
+        return self.__connection
+
+    def read(self, directory: str) -> Optional[DirectoryListing]:
+        """
+        Reads the stored listing of a single directory.
+
+        :param directory: The directory.
+        :return: The stored listing, or None if the directory isn't stored.
+        """
+        with self.__lock:
+            row = self.connection.execute("SELECT payload FROM listings WHERE directory = ?", (directory,)).fetchone()
+        if row is None:
+            return None
+
+        return ListingStore.__unpack(row[0])
+
+    def read_all(self) -> Dict[str, DirectoryListing]:
+        """
+        Reads every stored listing, meant for inspection only.
+
+        :return: All stored listings by directory.
+        """
+        with self.__lock:
+            rows = self.connection.execute("SELECT directory, payload FROM listings").fetchall()
+        return {directory: ListingStore.__unpack(payload) for directory, payload in rows}
+
+    def write(self, listings: Dict[str, DirectoryListing], removed: Iterable[str] = ()) -> None:
+        """
+        Writes (only) the given listings and removes the given directories in a single transaction.
+
+        :param listings: The listings that changed, by directory.
+        :param removed: The directories that need to be removed from the store.
+        """
+        now = time.time()
+        rows = [(directory, now, ListingStore.__pack(directory, listing)) for directory, listing in listings.items()]
+
+        with self.__lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO listings VALUES (?, ?, ?)", rows)
+            self.connection.executemany("DELETE FROM listings WHERE directory = ?", [(d,) for d in removed])
+
+    def compact(self) -> None:
+        """
+        Keeps the store bounded by dropping the listings that were saved the longest ago.
+        """
+        with self.__lock, self.connection:
+            (row_count,) = self.connection.execute("SELECT COUNT(*) FROM listings").fetchone()
+            if row_count <= self.max_rows:
+                return
+
+            self.connection.execute(
+                "DELETE FROM listings WHERE directory IN "
+                "(SELECT directory FROM listings ORDER BY saved_at ASC LIMIT ?)",
+                (row_count - self.max_rows,)
+            )
+
+    @staticmethod
+    def __pack(directory: str, listing: DirectoryListing) -> bytes:
+        from .fs import FileBatch
+
+        # files are stored columnar, which is several times smaller than pickling every File on its own
+        batch = FileBatch.from_files(directory, listing.files)
+        return pickle.dumps((listing.signature, batch, listing.directories), protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def __unpack(payload: bytes) -> DirectoryListing:
+        signature, batch, directories = pickle.loads(payload)
+        return DirectoryListing(signature, batch.to_files(), directories)
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+
+
+class DirectoryCache(ManagedCache):
+    DEFAULT_MAX_ENTRIES: Final[int] = 4096
+    DEFAULT_MAX_MEMORY: Final[int] = 64 * 1024 * 1024  # 64MB
+
+    def __init__(self, store_file: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_memory: int = DEFAULT_MAX_MEMORY, legacy_files: Iterable[str] = ()):
+        self.store_file: Final[Optional[str]] = store_file
+        self.legacy_files: Final[List[str]] = list(legacy_files)
+        self.max_entries: int = max_entries
+        self.max_memory: int = max_memory
+        self.memory_used: int = 0
+        # directory -> listing, ordered from least to most recently used
+        self.listings: OrderedDict[str, DirectoryListing] = OrderedDict()
+
+        # persistence, only what changed since the last flush gets written
+        self.store: Optional[ListingStore] = None
+        self.dirty: Dict[str, DirectoryListing] = {}
+        self.removed: Set[str] = set()
+        self.stats: CacheStats = CacheStats()
+        # the cache is flushed in the background while commands (and tab completion) use it
+        self.__lock = threading.RLock()
+
+    def entry_count(self) -> int:
+        return len(self.listings)
+
+    def memory_size(self) -> int:
+        return self.memory_used
+
+    def disk_size(self) -> int:
+        return self.file_size(self.store_file) if self.store_file else 0
+
+    def has_changes(self) -> bool:
+        with self.__lock:
+            return bool(self.dirty or self.removed)
+
+    def evict(self, max_memory: int) -> int:
+        evicted = 0
+        with self.__lock:
+            while self.listings and self.memory_used > max_memory:
+                _, listing = self.listings.popitem(last=False)
+                self.memory_used -= listing.size_estimate
+                evicted += 1
+        return evicted
+
+    def load(self) -> None:
+        """
+        Opens the store, listings are read from it lazily (on first access).
+        """
+        for legacy_file in self.legacy_files:
+            if os.path.exists(legacy_file):
+                os.remove(legacy_file)
+
+        if self.store_file is not None:
+            self.store = ListingStore(self.store_file)
+
+    def save(self) -> None:
+        self.flush()
+
+    @staticmethod
+    def signature_of(directory: str) -> Tuple[int, int]:
+        """
+        Creates the signature that decides whether a cached listing is still fresh.
+        A directory's mtime changes whenever an entry is added, removed or renamed in it, its ctime covers the rest.
+
+        :param directory: The directory.
+        :return: A tuple of the directory's modification and change time (ns).
+        """
+        stat = os.stat(directory)
+        return stat.st_mtime_ns, stat.st_ctime_ns
+
+    def __contains__(self, directory: str) -> bool:
+        return directory in self.listings
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def get(self, directory: str, signature: Optional[Tuple[int, int]] = None) -> Optional[DirectoryListing]:
+        """
+        Gets the cached listing of a directory.
+
+        :param directory: The directory.
+        :param signature: The current signature of the directory (stale listings get dropped), None skips validation.
+        :return: The cached listing, or None if there is no (fresh) listing.
+        """
+        started_at = time.perf_counter()
+        with self.__lock:
+            listing = self.listings.get(directory)
+            if listing is None:
+                listing = self.__read_through(directory)
+            if listing is None:
+                self.stats.record_lookup(False, started_at)
+                return None
+
+            if signature is not None and listing.signature != signature:
+                self.pop(directory)
+                self.stats.record_lookup(False, started_at)
+                return None
+
+            self.listings.move_to_end(directory)
+            self.stats.record_lookup(True, started_at)
+            return listing
+
+    def put(self, directory: str, signature: Tuple[int, int], files: List["File"], directories: List[str]) -> \
+            DirectoryListing:
+        """
+        Stores the listing of a directory, evicting the least recently used listings when the cache is full.
+
+        :param directory: The directory.
+        :param signature: The signature of the directory at the time it was scanned.
+        :param files: The files within the directory.
+        :param directories: The directories within the directory.
+        :return: The stored listing.
+        """
+        listing = DirectoryListing(signature, files, directories)
+        with self.__lock:
+            self.pop(directory)
+            self.__insert(directory, listing)
+            self.dirty[directory] = listing
+            self.removed.discard(directory)
+        return listing
+
+    def pop(self, directory: str) -> Optional[DirectoryListing]:
+        """
+        Removes the listing of a directory from the cache.
+
+        :param directory: The directory.
+        :return: The removed listing (if there was one).
+        """
+        with self.__lock:
+            listing = self.listings.pop(directory, None)
+            if listing is not None:
+                self.memory_used -= listing.size_estimate
+
+            self.dirty.pop(directory, None)
+            if self.store is not None:
+                self.removed.add(directory)
+        return listing
+
+    def mark_changed(self, directory: str) -> None:
+        """
+        Marks the cached listing of a directory as changed (e.g. after its files were updated in place), so it gets
+        saved with the next flush.
+
+        :param directory: The directory.
+        """
+        with self.__lock:
+            listing = self.listings.get(directory)
+            if listing is not None:
+                self.dirty[directory] = listing
+                self.removed.discard(directory)
+
+    def flush(self) -> None:
+        """
+        Writes the listings that changed since the last flush to the store.
+        Whatever changes while writing is kept for the next flush.
+        """
+        with self.__lock:
+            if self.store is None or (not self.dirty and not self.removed):
+                return
+            dirty, self.dirty = self.dirty, {}
+            removed, self.removed = self.removed, set()
+
+        try:
+            self.store.write(dirty, removed)
+        except Exception:
+            # put back what wasn't written, unless it changed again in the meantime
+            with self.__lock:
+                for directory, listing in dirty.items():
+                    if directory not in self.dirty and directory not in self.removed:
+                        self.dirty[directory] = listing
+                self.removed.update(directory for directory in removed if directory not in self.dirty)
+            raise
+        self.store.compact()
+
+    def __read_through(self, directory: str) -> Optional[DirectoryListing]:
+        if self.store is None or directory in self.removed:
+            return None
+
+        listing = self.store.read(directory)
+        if listing is not None:
+            self.__insert(directory, listing)
+        return listing
+
+    def __insert(self, directory: str, listing: DirectoryListing) -> None:
+        self.listings[directory] = listing
+        self.memory_used += listing.size_estimate
+        self.__evict()
+
+    def __evict(self) -> None:
+        # evicted listings are only dropped from memory, they stay in the store (or in dirty until flushed).
+        # always keep the most recent listing, even if it's huge on its own
+        while len(self.listings) > 1 and (len(self.listings) > self.max_entries or self.memory_used > self.max_memory):
+            _, listing = self.listings.popitem(last=False)
+            self.memory_used -= listing.size_estimate
@@ -0,0 +1,206 @@
+import mimetypes
+import os
+import pickle
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Dict, Final, List, Optional, Tuple
+
+from ..internal.caching import CacheStats, ManagedCache
+from ..internal.store import write_atomic
+
+try:
+    import win32api
+    from win32con import HKEY_CLASSES_ROOT
+except ImportError:
+    # not on windows (or pywin32 is missing), the portable backends will have to do
+    win32api = None
+
+
+class FileTypeBackend(ABC):
+    @abstractmethod
+    def resolve(self, extension: str) -> Optional[str]:
+        """
+        Resolves a file extension into a human-readable description.
+
+        :param extension: A (lowercase) file extension, including the dot.
+        :return: The description, or None if this backend doesn't know the extension.
+        """
+        pass
+
+
+class RegistryBackend(FileTypeBackend):
+    def resolve(self, extension: str) -> Optional[str]:
+        try:
+            key = win32api.RegOpenKey(HKEY_CLASSES_ROOT, extension)
+            file_type_class, _ = win32api.RegQueryValueEx(key, "")
+
+            key = win32api.RegOpenKey(HKEY_CLASSES_ROOT, file_type_class)
+            file_type_description, _ = win32api.RegQueryValueEx(key, "")
+
+            return file_type_description or None
+        except:
+            return None
+
+
+class BundledTableBackend(FileTypeBackend):
+    TABLE: Final[Dict[str, str]] = {
+        ".txt": "Text Document",
+        ".md": "Markdown File",
+        ".log": "Log File",
+        ".cfg": "Configuration File",
+        ".config": "Configuration File",
+        ".ini": "Configuration Settings",
+        ".json": "JSON File",
+        ".xml": "XML Document",
+        ".yml": "YAML File",
+        ".yaml": "YAML File",
+        ".csv": "CSV File",
+        ".py": "Python File",
+        ".pyc": "Compiled Python File",
+        ".js": "JavaScript File",
+        ".ts": "TypeScript File",
+        ".html": "HTML Document",
+        ".css": "CSS Stylesheet",
+        ".c": "C Source File",
+        ".cpp": "C++ Source File",
+        ".h": "C Header File",
+        ".java": "Java Source File",
+        ".rs": "Rust Source File",
+        ".sh": "Shell Script",
+        ".bat": "Windows Batch File",
+        ".ps1": "PowerShell Script",
+        ".exe": "Application",
+        ".dll": "Application Extension",
+        ".msi": "Windows Installer Package",
+        ".lnk": "Shortcut",
+        ".url": "Internet Shortcut",
+        ".zip": "Compressed (zipped) Folder",
+        ".7z": "7Z Archive",
+        ".rar": "RAR Archive",
+        ".tar": "TAR Archive",
+        ".gz": "GZ Archive",
+        ".iso": "Disc Image File",
+        ".pdf": "PDF Document",
+        ".doc": "Word 97-2003 Document",
+        ".docx": "Word Document",
+        ".xls": "Excel 97-2003 Worksheet",
+        ".xlsx": "Excel Worksheet",
+        ".ppt": "PowerPoint 97-2003 Presentation",
+        ".pptx": "PowerPoint Presentation",
+        ".png": "PNG File",
+        ".jpg": "JPG File",
+        ".jpeg": "JPEG File",
+        ".gif": "GIF File",
+        ".bmp": "BMP File",
+        ".svg": "SVG Document",
+        ".ico": "Icon",
+        ".webp": "WEBP File",
+        ".mp3": "MP3 File",
+        ".wav": "WAV File",
+        ".flac": "FLAC File",
+        ".ogg": "OGG File",
+        ".mp4": "MP4 Video",
+        ".mkv": "MKV Video",
+        ".avi": "AVI Video",
+        ".mov": "MOV Video",
+        ".webm": "WEBM Video",
+        ".ttf": "TrueType Font File",
+        ".otf": "OpenType Font File",
+    }
+
+    def resolve(self, extension: str) -> Optional[str]:
+        return self.TABLE.get(extension)
+
+
+class MimetypesBackend(FileTypeBackend):
+    def resolve(self, extension: str) -> Optional[str]:
+        mimetype, _ = mimetypes.guess_type(f"file{extension}", strict=False)
+        return mimetype
+
+
+class FileTypeResolver(ManagedCache):
+    MAX_ENTRY_AGE: Final[timedelta] = timedelta(days=7)
+    ENTRY_SIZE_ESTIMATE: Final[int] = 200
+
+    def __init__(self, cache_dir: str, backends: Optional[List[FileTypeBackend]] = None):
+        self.cache_file: Final[str] = os.path.join(cache_dir, "filetypes.cache")
+        self.backends: List[FileTypeBackend] = backends if backends is not None else self.default_backends()
+        # extension -> (resolved at, description or None when no backend knows it)
+        self.memo: Dict[str, Tuple[float, Optional[str]]] = {}
+        self.is_dirty: bool = False
+        self.stats: CacheStats = CacheStats()
+
+    def entry_count(self) -> int:
+        return len(self.memo)
+
+    def memory_size(self) -> int:
+        return len(self.memo) * self.ENTRY_SIZE_ESTIMATE
+
+    def disk_size(self) -> int:
+        return self.file_size(self.cache_file)
+
+    def has_changes(self) -> bool:
+        return self.is_dirty
+
+    @staticmethod
+    def default_backends() -> List[FileTypeBackend]:
+        backends = [BundledTableBackend(), MimetypesBackend()]
+        if win32api is not None:
+            # the registry knows best, so it goes first
+            backends.insert(0, RegistryBackend())
+        return backends
+
+    def resolve(self, extension: str, fallback: str = "") -> str:
+        """
+        Gets the name/mimetype of the file extension supplied. Each distinct extension is only looked up once.
+
+        :param extension: A file extension
+        :param fallback: What gets returned when no extension was supplied.
+        :return: The name the extension corresponds with in the system
+        """
+        if not extension:
+            return fallback
+
+        started_at = time.perf_counter()
+        extension = extension.lower()
+        entry = self.memo.get(extension)
+        self.stats.record_lookup(entry is not None, started_at)
+        if entry is None:
+            entry = (time.time(), self.__lookup(extension))
+            self.memo[extension] = entry
+            self.is_dirty = True
+
+        _, description = entry
+        return description if description is not None else extension.removeprefix(".")
+
+    def __lookup(self, extension: str) -> Optional[str]:
+        for backend in self.backends:
+            description = backend.resolve(extension)
+            if description:
+                return description
+        return None
+
+    def save(self) -> None:
+        """
+        Saves the extension table to a file.
+        """
+        if not self.is_dirty:
+            return
+
+        write_atomic(self.cache_file, {"memo": dict(self.memo)})
+        self.is_dirty = False
+
+    def load(self) -> None:
+        """
+        Loads the extension table from a file, dropping entries that are too old (installed software changes).
+        """
+        if os.path.exists(self.cache_file):
+            with open(file=self.cache_file, mode="rb") as f:
+                cache_data = pickle.load(f)
+
+            expires_before = time.time() - self.MAX_ENTRY_AGE.total_seconds()
+            self.memo = {
+                extension: entry for extension, entry in cache_data.get("memo", {}).items()
+                if entry[0] >= expires_before
+            }
@@ -1,18 +1,20 @@
 import os
 import re
-import mmap
 import pickle
 import zipfile
 import pyzipper
+from array import array
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 
-import win32api
-import xxhash
-from win32con import HKEY_CLASSES_ROOT
+from .cache import DirectoryCache
+from .filetypes import FileTypeResolver
+from .hashing import FileHasher, HashCache
 
 
 class File:
+    __slots__ = ("name", "location", "size_mb", "last_updated", "file_hash")
+
     def __init__(self, name: str, location: str, size_mb: float, last_updated: float, file_hash: Optional[str] = None):
         self.name = name
         self.location = location
@@ -24,11 +26,74 @@ class File:
         return f"{os.path.join(self.location, self.name)} | ~{self.size_mb:.2f}MB | {self.last_updated}"
 
 
+class FileBatch:
+    """
+    Columnar representation of many files that share the same location.
+    Stores parallel arrays instead of one object per file, which is a lot smaller in memory and when pickled.
+    """
+    __slots__ = ("location", "names", "sizes_mb", "mtimes", "hashes")
+
+    def __init__(self, location: str, names: List[str], sizes_mb: array, mtimes: array,
+                 hashes: Optional[List[Optional[str]]] = None):
+        self.location = location
+        self.names = names
+        self.sizes_mb = sizes_mb
+        self.mtimes = mtimes
+        self.hashes = hashes  # None when none of the files were hashed
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        return self.location, self.names, self.sizes_mb, self.mtimes, self.hashes
+
+    def __setstate__(self, state):
+        self.location, self.names, self.sizes_mb, self.mtimes, self.hashes = state
+
+    @staticmethod
+    def from_files(location: str, files: List[File]) -> "FileBatch":
+        """
+        Packs files into a batch.
+
+        :param location: The location all files share.
+        :param files: The files that need to be packed.
+        :return: The batch.
+        """
+        hashes = [file.file_hash for file in files]
+        if all(file_hash in (None, "N/A") for file_hash in hashes):
+            hashes = None
+
+        return FileBatch(
+            location=location,
+            names=[file.name for file in files],
+            sizes_mb=array("d", (file.size_mb for file in files)),
+            mtimes=array("d", (file.last_updated for file in files)),
+            hashes=hashes
+        )
+
+    def to_files(self) -> List[File]:
+        """
+        Unpacks the batch into separate files.
+
+        :return: A list of files (class File).
+        """
+        hashes = self.hashes if self.hashes is not None else ["N/A"] * len(self.names)
+        return [
+            File(name=name, location=self.location, size_mb=size_mb, last_updated=mtime, file_hash=file_hash)
+            for name, size_mb, mtime, file_hash in zip(self.names, self.sizes_mb, self.mtimes, hashes)
+        ]
+
+
 class FileSystem:
     def __init__(self, cache_dir: str):
-        self.cache_file = f"{cache_dir}/ls.cache"
-        self.file_cache: Dict[str, List[File]] = {}
-        self.directory_cache: Dict[str, List[str]] = {}
+        self.legacy_cache_file = f"{cache_dir}/ls.cache"
+        self.cache_file = f"{cache_dir}/ls.db"
+        # (the pickled legacy cache is superseded by the listing store)
+        self.directory_cache: DirectoryCache = DirectoryCache(store_file=self.cache_file,
+                                                              legacy_files=[self.legacy_cache_file])
+        self.hasher: FileHasher = FileHasher()
+        self.hash_cache: HashCache = HashCache(cache_dir)
+        self.file_types: FileTypeResolver = FileTypeResolver(cache_dir)
 
     @staticmethod
     def clean_path(directory: str, filter_args: bool = False) -> str:
@@ -85,50 +150,159 @@ class FileSystem:
             return os.path.realpath(os.path.join(os.path.expanduser("~"), directory.removeprefix("~\\")))
         return os.path.realpath(os.path.join(os.getcwd(), directory))
 
-    @staticmethod
-    def get_file_type(extension: str, fallback: str = "") -> str:
+    def get_file_type(self, extension: str, fallback: str = "") -> str:
         """
         Gets the name/mimetype of the file extension supplied.
 
         :param extension: A file extension
         :return: The name the extension corresponds with in the system
         """
-        if not extension:
-            return fallback
-
-        try:
-            key = win32api.RegOpenKey(HKEY_CLASSES_ROOT, extension)
-            file_type_class, _ = win32api.RegQueryValueEx(key, "")
-
-            key = win32api.RegOpenKey(HKEY_CLASSES_ROOT, file_type_class)
-            file_type_description, _ = win32api.RegQueryValueEx(key, "")
-
-            return file_type_description
-        except:
-            return extension.removeprefix(".")
+        return self.file_types.resolve(extension, fallback=fallback)
 
     @staticmethod
     def get_files_from_string(raw_str: str) -> List[str]:
         delimiter = "\"" if "\"" in raw_str.replace("'", "\"") else " "
         return [i.lstrip() for i in raw_str.split(delimiter) if i]
 
-    @staticmethod
-    def get_file_hash(file: str) -> str:
+    def get_file_hash(self, file: str) -> str:
         """
         Compute and return the XXHash-64 hash of the given file.
+        Files that haven't changed since they were last hashed are served from the hash cache without being read.
 
         :param file: The path to the file to hash.
         :return: The XXHash-64 hash of the file in hexadecimal format.
         """
-        hash_xx = xxhash.xxh64()
         try:
-            with open(file, "rb") as f:
-                mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
-                hash_xx.update(mapped_file)
-                mapped_file.close()
-            return hash_xx.hexdigest()
-        except (FileNotFoundError, IOError, ValueError):
-            return "<FILE EMPTY>"
+            signature = HashCache.signature_of(os.stat(file))
+        except OSError:
+            return self.hasher.hash(file)
+
+        file_hash = self.hash_cache.get(file, signature)
+        if file_hash is None:
+            file_hash = self.hasher.hash(file)
+            self.hash_cache.put(file, signature, file_hash)
+        return file_hash
+
+    def scan_directory(self, directory: str, use_cache: bool = False, calc_file_hashes: bool = False) -> \
+            Tuple[List[File], List[str]]:
+        """
+        Scans a directory in a single pass, collecting both its files and its subdirectories.
+        Every entry is stat'ed at most once (directories not at all, since `DirEntry` already knows its type).
+        Listings are cached and reused for as long as the directory's own mtime/ctime stay the same, the files of a
+        reused listing are re-stat'ed though (editing a file doesn't change the mtime of its directory).
+
+        :param directory: The directory that needs to be scanned.
+        :param use_cache: Trusts the cached listing (if available) without checking whether it's still fresh, files
+                          included.
+        :param calc_file_hashes: Calculates the hash value of the files.
+        :return: Returns a tuple of the files (class File) and the directories' names.
+        """
+        directory = self.clean_path(directory)
+
+        # checks if dir is available in cache
+        listing = self.directory_cache.get(directory) if use_cache else None
+        if listing is None:
+            try:
+                signature = DirectoryCache.signature_of(directory)
+            except FileNotFoundError:
+                # remove from cache if dir doesn't exist anymore
+                self.directory_cache.pop(directory)
+                raise NotADirectoryError(f"Directory '{directory}' doesn't exist.")
+
+            listing = self.directory_cache.get(directory, signature)
+            if listing is not None and not self.__restat(directory, listing.files):
+                listing = None
+            if listing is None:
+                files, directories = self.__scan(directory)
+                listing = self.directory_cache.put(directory, signature, files, directories)
+
+        if calc_file_hashes and self.calculate_file_hashes(listing.files):
+            # (the files are the cached ones, so the listing has to be saved again)
+            self.directory_cache.mark_changed(directory)
+
+        return listing.files, listing.directories
+
+    def __restat(self, directory: str, files: List[File]) -> bool:
+        """
+        Updates the size and modification time of cached files.
+
+        :param directory: The directory the files are in.
+        :param files: The cached files.
+        :return: False if a file couldn't be stat'ed anymore (the directory needs to be scanned again).
+        """
+        changed = False
+        for file in files:
+            try:
+                stat = os.stat(os.path.join(directory, file.name))
+            except OSError:
+                return False
+
+            size_mb = stat.st_size / (1024 * 1024)
+            if file.size_mb != size_mb or file.last_updated != stat.st_mtime:
+                file.size_mb = size_mb
+                file.last_updated = stat.st_mtime
+                file.file_hash = "N/A"  # (no longer the hash of this file)
+                changed = True
+
+        if changed:
+            self.directory_cache.mark_changed(directory)
+        return True
+
+    @staticmethod
+    def __scan(directory: str) -> Tuple[List[File], List[str]]:
+        files = []
+        directories = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        directories.append(entry.name)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files.append(File(
+                            name=entry.name,
+                            location=directory,
+                            size_mb=stat.st_size / (1024 * 1024),
+                            last_updated=stat.st_mtime,
+                            file_hash="N/A"
+                        ))
+                except OSError:
+                    # broken links, entries that vanished mid-scan, locked system files...
+                    continue
+
+        return files, directories
+
+    def calculate_file_hashes(self, files: List[File]) -> int:
+        """
+        Calculates the hashes of the given files and stores them on the files.
+        Cached hashes are reused, only new or changed files get hashed (on the hasher's worker pool).
+
+        :param files: The files that need to be hashed.
+        :return: The amount of files whose hash changed.
+        """
+        changed = 0
+        pending: Dict[str, Tuple[File, Tuple[int, int, int]]] = {}
+        for file in files:
+            path = os.path.join(file.location, file.name)
+            try:
+                signature = HashCache.signature_of(os.stat(path))
+            except OSError:
+                continue
+
+            file_hash = self.hash_cache.get(path, signature)
+            if file_hash is None:
+                pending[path] = (file, signature)
+            elif file.file_hash != file_hash:
+                file.file_hash = file_hash
+                changed += 1
+
+        for path, file_hash in self.hasher.hash_files(pending.keys()):
+            file, signature = pending[path]
+            if file.file_hash != file_hash:
+                file.file_hash = file_hash
+                changed += 1
+            self.hash_cache.put(path, signature, file_hash)
+        return changed
 
     def get_files_in_directory(self, directory: str, use_cache: bool = False, calc_file_hashes: bool = False) -> \
             List[File]:
@@ -141,37 +315,7 @@ class FileSystem:
         :param calc_file_hashes: Calculates the hash value of the file.
         :return: Returns a list of files (class File).
         """
-        directory = self.clean_path(directory)
-
-        # checks if dir exists
-        if directory and not os.path.exists(directory):
-            if directory in self.directory_cache:
-                # remove from cache if dir doesn't exist anymore
-                self.directory_cache.pop(directory)
-            raise NotADirectoryError(f"Directory '{directory}' doesn't exist.")
-
-        # checks if dir is available in cache
-        if use_cache and directory in self.file_cache:
-            return self.file_cache[directory]
-
-        files = []
-        for entry in os.listdir(directory):
-            if os.path.isfile(os.path.join(directory, entry)):
-                full_path = os.path.join(directory, entry)
-                file_size = os.stat(full_path).st_size / (1024 * 1024)
-                last_updated = os.path.getmtime(full_path)
-                file_hash = self.get_file_hash(full_path) if calc_file_hashes else "N/A"
-
-                files.append(File(
-                    name=entry,
-                    location=directory,
-                    size_mb=file_size,
-                    last_updated=last_updated,
-                    file_hash=file_hash
-                ))
-
-        # save to cache before returning
-        self.file_cache[directory] = files
+        files, _ = self.scan_directory(directory, use_cache, calc_file_hashes)
         return files
 
     def get_directories_in_directory(self, directory: str, use_cache: bool = False) -> List[str]:
@@ -180,28 +324,10 @@ class FileSystem:
         If anything fails an error will be thrown with a corresponding error message.
 
         :param directory: The directory of which the directories are requested.
-        :param use_cache: Makes call use the cache (if available) instead of checking again.
+        :param use_cache: Trusts the cached listing (if available) without checking whether it's still fresh.
         :return: Returns a list of directories' names.
         """
-        directory = self.clean_path(directory)
-
-        # checks if dir exists
-        if directory and not os.path.exists(directory):
-            if directory in self.directory_cache:
-                self.directory_cache.pop(directory)
-            raise NotADirectoryError(f"Directory '{directory}' doesn't exist.")
-
-        # checks if dir is available in cache
-        if use_cache and directory in self.directory_cache:
-            return self.directory_cache[directory]
-
-        directories = []
-        for entry in os.listdir(directory):
-            if os.path.isdir(os.path.join(directory, entry)):
-                directories.append(entry)
-
-        # save to cache before returning
-        self.directory_cache[directory] = directories
+        _, directories = self.scan_directory(directory, use_cache)
         return directories
 
     def zip(self, folder: str, with_password: Optional[str] = None) -> Optional[bool]:
@@ -301,26 +427,12 @@ class FileSystem:
         with open(file=file, mode="w") as _:
             return
 
-    def save(self) -> None:
-        """
-        Saves the cache to a file.
-        """
-        try:
-            with open(file=self.cache_file, mode="wb") as f:
-                pickle.dump({"file_cache": self.file_cache, "directory_cache": self.directory_cache}, f)
-        except Exception as e:
-            print("Couldn't save cache.")
-            print(e)
-
-    def load(self) -> None:
+    def dump_cache(self) -> Dict[str, Any]:
         """
-        Loads the cache from a file.
+        Reads the entire persisted cache, meant for inspection only.
         """
-        if os.path.exists(self.cache_file):
-            with open(file=self.cache_file, mode="rb") as f:
-                cache_data = pickle.load(f)
-                self.file_cache = cache_data.get("file_cache", {})
-                self.directory_cache = cache_data.get("directory_cache", {})
+        self.directory_cache.flush()
+        return {"listings": self.directory_cache.store.read_all() if self.directory_cache.store else {}}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+import os
+import pickle
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Final, Iterable, Iterator, Optional, Tuple
+
+import xxhash
+
+from ..internal.caching import CacheStats, ManagedCache
+from ..internal.store import write_atomic
+
+EMPTY_FILE_HASH: Final[str] = "<FILE EMPTY>"
+
+
+def hash_file(file: str, chunk_size: int) -> str:
+    """
+    Computes the XXHash-64 hash of a file by reading it in bounded chunks.
+    Lives at module level so process pools are able to pickle it.
+
+    :param file: The path to the file to hash.
+    :param chunk_size: The amount of bytes that get read (and kept in memory) at once.
+    :return: The XXHash-64 hash of the file in hexadecimal format.
+    """
+    hash_xx = xxhash.xxh64()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    total_read = 0
+
+    try:
+        with open(file, "rb", buffering=0) as f:
+            while bytes_read := f.readinto(buffer):
+                hash_xx.update(view[:bytes_read])
+                total_read += bytes_read
+    except (FileNotFoundError, IOError, ValueError):
+        return EMPTY_FILE_HASH
+
+    if total_read == 0:
+        return EMPTY_FILE_HASH
+    return hash_xx.hexdigest()
+
+
+class FileHasher:
+    DEFAULT_CHUNK_SIZE: Final[int] = 4 * 1024 * 1024  # 4MB
+
+    def __init__(self, max_workers: Optional[int] = None, use_processes: bool = False,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.max_workers: Optional[int] = max_workers
+        self.use_processes: bool = use_processes
+        self.chunk_size: int = chunk_size
+
+    def hash(self, file: str) -> str:
+        """
+        Hashes a single file on the calling thread.
+
+        :param file: The path to the file to hash.
+        :return: The XXHash-64 hash of the file in hexadecimal format.
+        """
+        return hash_file(file, self.chunk_size)
+
+    def hash_files(self, files: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """
+        Hashes multiple files on a worker pool, yielding results in the order they finish.
+
+        :param files: The paths to the files to hash.
+        :return: An iterator of (path, hash) tuples.
+        """
+        files = list(files)
+        if not files:
+            return
+
+        # not worth spinning up a pool for
+        if len(files) == 1:
+            yield files[0], self.hash(files[0])
+            return
+
+        with self.__create_executor(len(files)) as executor:
+            futures = {executor.submit(hash_file, file, self.chunk_size): file for file in files}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def __create_executor(self, amount_of_files: int) -> Executor:
+        max_workers = min(self.max_workers or os.cpu_count() or 1, amount_of_files)
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=max_workers)
+
+        # reads and xxhash updates release the GIL, so threads scale fine for most disks
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+
+class HashCache(ManagedCache):
+    DEFAULT_MAX_ENTRIES: Final[int] = 100_000
+    ENTRY_SIZE_ESTIMATE: Final[int] = 300  # path, signature tuple, hex digest and the dict slot
+
+    def __init__(self, cache_dir: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_file: Final[str] = os.path.join(cache_dir, "hashes.cache")
+        self.max_entries: int = max_entries
+        # path -> (signature, hash), ordered from least to most recently used
+        self.entries: OrderedDict[str, Tuple[Tuple[int, int, int], str]] = OrderedDict()
+        self.stats: CacheStats = CacheStats()
+        self.is_dirty: bool = False
+
+    def entry_count(self) -> int:
+        return len(self.entries)
+
+    def memory_size(self) -> int:
+        return len(self.entries) * self.ENTRY_SIZE_ESTIMATE
+
+    def disk_size(self) -> int:
+        return self.file_size(self.cache_file)
+
+    def has_changes(self) -> bool:
+        return self.is_dirty
+
+    def evict(self, max_memory: int) -> int:
+        evicted = 0
+        while self.entries and self.memory_size() > max_memory:
+            self.entries.popitem(last=False)
+            evicted += 1
+        self.is_dirty = self.is_dirty or evicted > 0
+        return evicted
+
+    @staticmethod
+    def signature_of(stat: os.stat_result) -> Tuple[int, int, int]:
+        """
+        Creates the signature that decides whether a cached hash is still valid.
+
+        :param stat: The stat result of the file.
+        :return: A tuple of the file's size, modification time (ns) and inode.
+        """
+        return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+    def get(self, path: str, signature: Tuple[int, int, int]) -> Optional[str]:
+        """
+        Gets the cached hash of a file, but only if the file didn't change since it was hashed.
+
+        :param path: The path to the file.
+        :param signature: The current signature of the file.
+        :return: The cached hash, or None if there is no (valid) entry.
+        """
+        started_at = time.perf_counter()
+        entry = self.entries.get(path)
+        if entry is None:
+            self.stats.record_lookup(False, started_at)
+            return None
+
+        cached_signature, file_hash = entry
+        if cached_signature != signature:
+            # stale, file has changed since
+            del self.entries[path]
+            self.is_dirty = True
+            self.stats.record_lookup(False, started_at)
+            return None
+
+        self.entries.move_to_end(path)
+        self.stats.record_lookup(True, started_at)
+        return file_hash
+
+    def put(self, path: str, signature: Tuple[int, int, int], file_hash: str) -> None:
+        """
+        Stores the hash of a file, evicting the least recently used entries when the cache is full.
+
+        :param path: The path to the file.
+        :param signature: The signature of the file at the time it was hashed.
+        :param file_hash: The hash of the file.
+        """
+        self.entries[path] = (signature, file_hash)
+        self.entries.move_to_end(path)
+        self.is_dirty = True
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self) -> None:
+        """
+        Saves the cache to a file.
+        """
+        self.is_dirty = False
+        try:
+            write_atomic(self.cache_file, {"entries": self.entries})
+        except BaseException:
+            self.is_dirty = True
+            raise
+
+    def load(self) -> None:
+        """
+        Loads the cache from a file.
+        """
+        if os.path.exists(self.cache_file):
+            with open(file=self.cache_file, mode="rb") as f:
+                cache_data = pickle.load(f)
+                self.entries = cache_data.get("entries", OrderedDict())
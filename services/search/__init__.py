@@ -1,59 +1,95 @@
 import json
 
-import xxhash
 import os
-import pickle
-from abc import ABC, ABCMeta
-from typing import Final, Dict, List, Optional
+import threading
+from abc import ABCMeta
+from typing import Final, List, Optional, Tuple
 
+from .cache import ResultCache, CachedResults
+from ..internal.caching import CacheStats, ManagedCache
+from ..internal.store import CacheStore, CacheNamespace
 
-class Searcher(ABC, metaclass=ABCMeta):
-    def __init__(self, cache_dir: str, cache_fn: str, authority: str = "DEFAULT"):
+
+class Searcher(ManagedCache, metaclass=ABCMeta):
+    def __init__(self, cache_dir: str, cache_fn: str, authority: str = "DEFAULT", store: Optional[CacheStore] = None):
         self.cache_dir: Final[str] = cache_dir
-        self.cache_file: Final[str] = f"{cache_dir}/{cache_fn}.cache"
-        self.results_cache: Dict[str, List[SearchResult]] = {}
-        self.hash_name: Final[str] = xxhash.xxh64(authority).hexdigest()
+        self.legacy_cache_file: Final[str] = f"{cache_dir}/{cache_fn}.cache"
+        # every searcher has a file of its own, e.g. 'search/ddg.cache'
+        self.store: Final[CacheNamespace] = (store or CacheStore(cache_dir)).namespace(f"{cache_fn}/{authority.lower()}")
+        self.stats: CacheStats = CacheStats()
+        self.__results_cache: ResultCache = ResultCache(stats=self.stats)
+        self.__is_loaded: bool = False
+        self.__load_lock = threading.Lock()
+
+    @property
+    def results_cache(self) -> ResultCache:
+        # the cache file is only read once the cache is actually used
+        if not self.__is_loaded:
+            with self.__load_lock:
+                if not self.__is_loaded:
+                    self.__results_cache.restore(self.__read_entries())
+                    self.__is_loaded = True
+        return self.__results_cache
+
+    def __read_entries(self) -> List[Tuple[str, CachedResults]]:
+        entries = self.store.read(default=[])
+        return entries if isinstance(entries, list) else []
+
+    # the sizes don't force the cache to be read, an unused cache takes up no memory
+    def entry_count(self) -> int:
+        return len(self.__results_cache)
+
+    def memory_size(self) -> int:
+        return self.__results_cache.memory_size()
+
+    def disk_size(self) -> int:
+        return self.store.size()
+
+    def evict(self, max_memory: int) -> int:
+        return self.__results_cache.evict(max_memory)
 
-    def save(self) -> bool:
+    def has_changes(self) -> bool:
+        return self.__is_loaded and self.__results_cache.is_dirty
+
+    def save(self) -> None:
         """
-        Saves the cache to a file.
+        Saves the cache to its file, if it changed. Entries other instances saved in the meantime are kept.
         """
+        if not self.__is_loaded or not self.__results_cache.is_dirty:
+            return
+
+        def merge(entries):
+            self.__results_cache.merge(entries if isinstance(entries, list) else [])
+            # (puts made while the file is being written have to stay dirty)
+            return self.__results_cache.dump(mark_clean=True)
+
         try:
-            # read existing contents
-            try:
-                with open(file=self.cache_file, mode="rb") as f:
-                    full_cache = pickle.load(f)
-            except (FileNotFoundError, EOFError):
-                full_cache = {}
-            full_cache[self.hash_name] = self.results_cache
-
-            # write full cache into file
-            with open(file=self.cache_file, mode="wb") as f:
-                pickle.dump(full_cache, f)
-        except Exception as e:
-            # bad...
-            print("Couldn't save cache.")
-            print(e)
-            return False
-        return True
-
-    def load(self) -> Optional[Dict[str, List["SearchResult"]]]:
+            self.store.update(merge, default=[])
+        except BaseException:
+            self.__results_cache.is_dirty = True
+            raise
+
+    def load(self) -> None:
         """
-        Loads the cache from a file.
+        Prepares the cache to be loaded, the file itself is read lazily on first use.
         """
-        if os.path.exists(self.cache_file):
-            with open(file=self.cache_file, mode="rb") as f:
-                cache_data = pickle.load(f)
-                self.results_cache = cache_data.get(self.hash_name, {})
-            return self.results_cache
-        return {}
+        # searchers used to share a single file
+        try:
+            os.remove(self.legacy_cache_file)
+        except FileNotFoundError:
+            pass
+
+        with self.__load_lock:
+            self.__results_cache = ResultCache(stats=self.stats)
+            self.__is_loaded = False
 
 
 class SearchResult:
-    def __init__(self, title: str, location: str, ranking: int = -1):
+    def __init__(self, title: str, location: str, ranking: int = -1, score: float = 0.0):
         self.title: str = title
         self.location: str = location
         self.ranking: int = ranking
+        self.score: float = score
 
     def __repr__(self):
         return f"{self.title} - {self.location}"
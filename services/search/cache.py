@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Final, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from ..internal.caching import CacheStats
+
+if TYPE_CHECKING:
+    from . import SearchResult
+
+
+class CachedResults:
+    __slots__ = ("results", "stored_at", "validators")
+
+    def __init__(self, results: List["SearchResult"], stored_at: float, validators: Optional[Dict[str, str]] = None):
+        self.results = results
+        self.stored_at = stored_at
+        # ETag/Last-Modified of the response, to revalidate with a conditional request
+        self.validators = validators or {}
+
+    def __getstate__(self):
+        return self.results, self.stored_at, self.validators
+
+    def __setstate__(self, state):
+        self.results, self.stored_at, self.validators = state
+
+
+class ResultCache:
+    """
+    LRU cache of search results by (normalized) query. Entries are fresh for `ttl`, after that they can still be served
+    while they're being revalidated in the background, until they are older than `ttl + stale_ttl`.
+    """
+    DEFAULT_TTL: Final[timedelta] = timedelta(hours=12)
+    DEFAULT_STALE_TTL: Final[timedelta] = timedelta(days=7)
+    DEFAULT_MAX_ENTRIES: Final[int] = 512
+    RESULT_SIZE_ESTIMATE: Final[int] = 300
+
+    FRESH: Final[str] = "fresh"
+    STALE: Final[str] = "stale"
+
+    def __init__(self, ttl: timedelta = DEFAULT_TTL, stale_ttl: timedelta = DEFAULT_STALE_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, stats: Optional[CacheStats] = None):
+        self.ttl: timedelta = ttl
+        self.stale_ttl: timedelta = stale_ttl
+        self.max_entries: int = max_entries
+        self.entries: OrderedDict[str, CachedResults] = OrderedDict()
+        # stale hits count as hits in the stats as well
+        self.stats: CacheStats = stats or CacheStats()
+        self.stale_hits: int = 0
+        # keys evicted to enforce a size limit, so merging doesn't bring them back from the file
+        self.evicted: Set[str] = set()
+        self.is_dirty: bool = False
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+        Normalizes a query, so queries that only differ in casing or whitespace share their results.
+
+        :param query: The query.
+        :return: The cache key of the query.
+        """
+        return " ".join(query.casefold().split())
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, query: str) -> bool:
+        return self.get(query, count=False)[0] is not None
+
+    def freshness_of(self, entry: CachedResults, now: Optional[float] = None) -> Optional[str]:
+        """
+        Gets how fresh an entry is.
+
+        :param entry: The entry.
+        :param now: The current time, defaults to time.time().
+        :return: FRESH, STALE or None when the entry expired entirely.
+        """
+        age = (now or time.time()) - entry.stored_at
+        if age <= self.ttl.total_seconds():
+            return self.FRESH
+        if age <= (self.ttl + self.stale_ttl).total_seconds():
+            return self.STALE
+        return None
+
+    def get(self, query: str, count: bool = True) -> Tuple[Optional[CachedResults], Optional[str]]:
+        """
+        Gets the cached results of a query.
+
+        :param query: The query.
+        :param count: Counts the lookup as a hit/miss.
+        :return: The entry and its freshness (FRESH or STALE), or (None, None) when nothing usable is cached.
+        """
+        started_at = time.perf_counter()
+        key = self.normalize(query)
+        with self.__lock:
+            entry = self.entries.get(key)
+            freshness = self.freshness_of(entry) if entry is not None else None
+            if entry is not None and freshness is None:
+                del self.entries[key]
+                entry = None
+
+            if entry is not None:
+                self.entries.move_to_end(key)
+            if count:
+                self.stats.record_lookup(entry is not None, started_at)
+                if freshness == self.STALE:
+                    self.stale_hits += 1
+            return (entry, freshness) if entry is not None else (None, None)
+
+    def put(self, query: str, results: List["SearchResult"], validators: Optional[Dict[str, str]] = None) -> None:
+        """
+        Caches the results of a query, evicting the least recently used entries when full.
+
+        :param query: The query.
+        :param results: The results.
+        :param validators: The ETag/Last-Modified headers of the response the results came from.
+        """
+        key = self.normalize(query)
+        with self.__lock:
+            self.entries[key] = CachedResults(results, time.time(), validators)
+            self.evicted.discard(key)
+            self.entries.move_to_end(key)
+            self.is_dirty = True
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def touch(self, query: str) -> None:
+        """
+        Marks the results of a query as fresh again (when revalidation found they're unchanged).
+
+        :param query: The query.
+        """
+        with self.__lock:
+            entry = self.entries.get(self.normalize(query))
+            if entry is not None:
+                entry.stored_at = time.time()
+                self.is_dirty = True
+
+    def prune(self) -> int:
+        """
+        Drops all entries that expired entirely.
+
+        :return: The amount of entries that were dropped.
+        """
+        now = time.time()
+        with self.__lock:
+            expired = [key for key, entry in self.entries.items() if self.freshness_of(entry, now) is None]
+            for key in expired:
+                del self.entries[key]
+        return len(expired)
+
+    def memory_size(self) -> int:
+        return sum(len(entry.results) + 1 for entry in list(self.entries.values())) * self.RESULT_SIZE_ESTIMATE
+
+    def evict(self, max_memory: int) -> int:
+        """
+        Evicts the least recently used entries until the cache fits in the given amount of memory.
+
+        :param max_memory: The amount of bytes the cache may take up.
+        :return: The amount of entries that were evicted.
+        """
+        evicted = 0
+        with self.__lock:
+            size = sum(len(entry.results) + 1 for entry in self.entries.values()) * self.RESULT_SIZE_ESTIMATE
+            while self.entries and size > max_memory:
+                key, entry = self.entries.popitem(last=False)
+                self.evicted.add(key)
+                size -= (len(entry.results) + 1) * self.RESULT_SIZE_ESTIMATE
+                evicted += 1
+            if evicted:
+                self.is_dirty = True
+        return evicted
+
+    def dump(self, mark_clean: bool = False) -> List[Tuple[str, CachedResults]]:
+        """
+        Gets the entries to persist, least recently used first. Expired entries are left out.
+
+        :param mark_clean: Clears the dirty flag along with taking the entries, whatever changes afterwards keeps the
+                           cache dirty.
+        :return: A list of (key, entry) tuples.
+        """
+        self.prune()
+        with self.__lock:
+            if mark_clean:
+                self.is_dirty = False
+            return list(self.entries.items())
+
+    def restore(self, entries: List[Tuple[str, CachedResults]]) -> None:
+        """
+        Restores persisted entries (see dump), skipping the ones that expired in the meantime.
+
+        :param entries: A list of (key, entry) tuples.
+        """
+        now = time.time()
+        with self.__lock:
+            self.entries = OrderedDict(
+                (key, entry) for key, entry in entries if self.freshness_of(entry, now) is not None
+            )
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def merge(self, entries: List[Tuple[str, CachedResults]]) -> None:
+        """
+        Merges persisted entries (of another instance) into the cache, the most recently stored results of a query win.
+        Entries that are only persisted count as less recently used than the ones in memory.
+
+        :param entries: A list of (key, entry) tuples.
+        """
+        now = time.time()
+        persisted = dict(entries)
+        with self.__lock:
+            merged = OrderedDict(
+                (key, entry) for key, entry in persisted.items()
+                if key not in self.entries and key not in self.evicted and self.freshness_of(entry, now) is not None
+            )
+            for key, entry in self.entries.items():
+                other = persisted.get(key)
+                merged[key] = other if other is not None and other.stored_at > entry.stored_at else entry
+
+            self.entries = merged
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
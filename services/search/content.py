@@ -0,0 +1,264 @@
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from itertools import chain, islice
+from typing import ContextManager, Dict, Final, Iterable, Iterator, List, Optional, Tuple
+
+from . import SearchResult
+
+BINARY_SNIFF_SIZE: Final[int] = 8192
+MMAP_MIN_SIZE: Final[int] = 64 * 1024  # smaller files are cheaper to just read
+MAX_LINE_LENGTH: Final[int] = 200
+
+
+class ContentMatch(SearchResult):
+    def __init__(self, location: str, line_number: int, line: str):
+        super().__init__(f"{os.path.basename(location)}:{line_number}", location)
+        self.line_number: int = line_number
+        self.line: str = line
+
+    def __repr__(self):
+        return f"{self.location}:{self.line_number}: {self.line}"
+
+
+class ContentQuery:
+    """
+    What to look for in the contents of files. Plain data, so it can be sent to worker processes.
+    """
+    __slots__ = ("pattern", "is_regex", "ignore_case", "max_matches_per_file")
+
+    def __init__(self, pattern: str, is_regex: bool = False, ignore_case: bool = False,
+                 max_matches_per_file: Optional[int] = None):
+        self.pattern: bytes = pattern.encode("utf-8")
+        self.is_regex: bool = is_regex
+        self.ignore_case: bool = ignore_case
+        self.max_matches_per_file: Optional[int] = max_matches_per_file
+
+    def __getstate__(self):
+        return self.pattern, self.is_regex, self.ignore_case, self.max_matches_per_file
+
+    def __setstate__(self, state):
+        self.pattern, self.is_regex, self.ignore_case, self.max_matches_per_file = state
+
+    def compile(self) -> Optional[re.Pattern]:
+        """
+        Compiles the query into a (byte) regex, plain case-sensitive literals don't need one.
+
+        :return: The compiled pattern, or None when a plain substring search will do.
+        """
+        if not self.is_regex and not self.ignore_case:
+            return None
+
+        pattern = self.pattern if self.is_regex else re.escape(self.pattern)
+        return re.compile(pattern, re.IGNORECASE | re.MULTILINE if self.ignore_case else re.MULTILINE)
+
+
+def is_binary(data) -> bool:
+    """
+    Sniffs whether a file is binary the same way grep does: by looking for NUL bytes near the start.
+
+    :param data: The (mapped) contents of the file.
+    :return: If the file looks binary.
+    """
+    return data.find(b"\x00", 0, BINARY_SNIFF_SIZE) != -1
+
+
+def grep_buffer(data, query: ContentQuery, regex: Optional[re.Pattern]) -> List[Tuple[int, str]]:
+    """
+    Finds the lines that match a query, every line is reported once no matter how many times it matches.
+
+    :param data: The contents to search, bytes or a memory-mapped file.
+    :param query: The query.
+    :param regex: The compiled query, see ContentQuery.compile.
+    :return: A list of (line number, line) tuples.
+    """
+    matches = []
+    line_number = 1
+    counted_until = 0
+    position = 0
+    length = len(data)
+
+    while position < length:
+        if regex is None:
+            start = data.find(query.pattern, position)
+            if start == -1:
+                break
+        else:
+            found = regex.search(data, position)
+            if found is None:
+                break
+            start = found.start()
+
+        line_start = data.rfind(b"\n", 0, start) + 1
+        line_end = data.find(b"\n", start)
+        if line_end == -1:
+            line_end = length
+
+        # only counts the newlines between two matches, not the whole file over again
+        line_number += data[counted_until:line_start].count(b"\n")
+        counted_until = line_start
+
+        line = data[line_start:min(line_end, line_start + MAX_LINE_LENGTH)].decode("utf-8", errors="replace")
+        matches.append((line_number, line.strip()))
+        if query.max_matches_per_file and len(matches) >= query.max_matches_per_file:
+            break
+
+        # continue on the next line
+        position = line_end + 1
+
+    return matches
+
+
+def grep_file(file: str, query: ContentQuery, regex: Optional[re.Pattern]) -> List[Tuple[int, str]]:
+    """
+    Greps a single file, big files are memory-mapped instead of read. Binary files are skipped.
+
+    :param file: The path to the file.
+    :param query: The query.
+    :param regex: The compiled query, see ContentQuery.compile.
+    :return: A list of (line number, line) tuples.
+    """
+    try:
+        with open(file, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return []
+
+            if size < MMAP_MIN_SIZE:
+                data = f.read()
+                return [] if is_binary(data) else grep_buffer(data, query, regex)
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return [] if is_binary(data) else grep_buffer(data, query, regex)
+    except (OSError, ValueError):
+        # no permission, vanished, locked, ...
+        return []
+
+
+def grep_files(files: List[str], query: ContentQuery) -> List[Tuple[str, int, str]]:
+    """
+    Greps a batch of files. Lives at module level so process pools are able to pickle it.
+
+    :param files: The paths to the files.
+    :param query: The query.
+    :return: A list of (path, line number, line) tuples.
+    """
+    regex = query.compile()
+    return [
+        (file, line_number, line)
+        for file in files
+        for line_number, line in grep_file(file, query, regex)
+    ]
+
+
+class ContentScanner:
+    """
+    Greps files on a worker pool. Files are handed out in batches, so the pool isn't flooded with tiny tasks.
+    """
+    BATCH_MAX_FILES: Final[int] = 128
+    BATCH_MAX_BYTES: Final[int] = 16 * 1024 * 1024  # 16MB
+    PROCESS_MIN_BATCHES: Final[int] = 8  # smaller scans are over before worker processes would pay off
+
+    def __init__(self, max_workers: Optional[int] = None, use_processes: Optional[bool] = None):
+        self.max_workers: Optional[int] = max_workers
+        # None picks per scan: processes for large scans (grepping holds the GIL), threads for small ones
+        self.use_processes: Optional[bool] = use_processes
+        # (kept alive between scans, on Windows every worker process imports the entire app first)
+        self.__process_pool: Optional[ProcessPoolExecutor] = None
+        self.__process_pool_workers: int = 0
+        self.__lock: threading.Lock = threading.Lock()
+
+    def batches(self, files: Iterable[Tuple[str, int]]) -> Iterator[List[str]]:
+        """
+        Groups files into batches of roughly equal work.
+
+        :param files: (path, size) tuples of the files.
+        :return: An iterator of batches of paths.
+        """
+        batch = []
+        batch_size = 0
+        for file, size in files:
+            batch.append(file)
+            batch_size += size
+            if len(batch) >= self.BATCH_MAX_FILES or batch_size >= self.BATCH_MAX_BYTES:
+                yield batch
+                batch = []
+                batch_size = 0
+        if batch:
+            yield batch
+
+    def scan(self, files: Iterable[Tuple[str, int]], query: ContentQuery,
+             stop_event: Optional[threading.Event] = None) -> Iterator[ContentMatch]:
+        """
+        Greps files, yielding matches as soon as their batch is done.
+
+        :param files: (path, size) tuples of the files to grep.
+        :param query: The query.
+        :param stop_event: Stops the scan as soon as it is set, pending batches are cancelled.
+        :return: An iterator over the matching lines.
+        """
+        batches = self.batches(files)
+        # looking ahead a few batches tells small scans from large ones
+        ahead = list(islice(batches, self.PROCESS_MIN_BATCHES))
+        if not ahead:
+            return
+
+        # not worth spinning up a pool for
+        if len(ahead) == 1:
+            for file, line_number, line in grep_files(ahead[0], query):
+                yield ContentMatch(file, line_number, line)
+            return
+
+        use_processes = self.use_processes
+        if use_processes is None:
+            use_processes = len(ahead) >= self.PROCESS_MIN_BATCHES
+        batches = chain(ahead, batches)
+
+        max_workers = self.max_workers or os.cpu_count() or 1
+        with self.__create_executor(max_workers, use_processes) as executor:
+            max_pending = max_workers * 2
+            pending: Dict[Future, None] = {}
+            try:
+                while not (stop_event is not None and stop_event.is_set()):
+                    # keep the workers busy without queueing up the whole tree
+                    while len(pending) < max_pending and (batch := next(batches, None)) is not None:
+                        pending[executor.submit(grep_files, batch, query)] = None
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.pop(future)
+                        for file, line_number, line in future.result():
+                            if stop_event is not None and stop_event.is_set():
+                                return
+                            yield ContentMatch(file, line_number, line)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def close(self) -> None:
+        """
+        Shuts down the worker processes (if there are any), a later scan starts new ones.
+        """
+        with self.__lock:
+            if self.__process_pool is not None:
+                self.__process_pool.shutdown(wait=False, cancel_futures=True)
+                self.__process_pool = None
+
+    def __create_executor(self, max_workers: int, use_processes: bool) -> ContextManager[Executor]:
+        if not use_processes:
+            return ThreadPoolExecutor(max_workers=max_workers)
+
+        # the process pool outlives the scan, so it must not be shut down when the scan is done
+        with self.__lock:
+            if self.__process_pool is None or self.__process_pool_workers != max_workers or \
+                    getattr(self.__process_pool, "_broken", False):
+                if self.__process_pool is not None:
+                    self.__process_pool.shutdown(wait=False, cancel_futures=True)
+                self.__process_pool = ProcessPoolExecutor(max_workers=max_workers)
+                self.__process_pool_workers = max_workers
+            return nullcontext(self.__process_pool)
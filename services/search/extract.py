@@ -0,0 +1,126 @@
+import html
+import re
+from abc import ABC, abstractmethod
+from typing import Final, List, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:
+    # optional, the other extractors work without it
+    lxml = None
+
+
+class ResultExtractor(ABC):
+    """
+    Pulls the result links out of a search results page.
+    """
+
+    def __init__(self, link_class: str = "result__a"):
+        self.link_class: Final[str] = link_class
+
+    @abstractmethod
+    def extract(self, page: str) -> List[Tuple[str, str]]:
+        """
+        Extracts the result links of a page.
+
+        :param page: The HTML of the page.
+        :return: A list of (title, href) tuples, in the order they appear on the page.
+        """
+        pass
+
+
+class RegexExtractor(ResultExtractor):
+    """
+    Fast path for the known result markup: only the result anchors get looked at, the rest of the page is skipped over.
+    """
+    TAG_PATTERN: Final[re.Pattern] = re.compile(r"<[^>]+>")
+    HREF_PATTERN: Final[re.Pattern] = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+
+    def __init__(self, link_class: str = "result__a", anchor_pattern: Optional[str] = None):
+        """
+        :param link_class: The class of the result anchors.
+        :param anchor_pattern: Custom pattern for markup where the anchors can't be found by class, its groups have to
+                               capture the attributes and the content of the anchor.
+        """
+        super().__init__(link_class)
+        self.anchor_pattern: Final[re.Pattern] = re.compile(
+            anchor_pattern or
+            r"""<a\s([^>]*?\bclass\s*=\s*["'][^"']*\b""" + re.escape(link_class) + r"""\b[^"']*["'][^>]*)>(.*?)</a\s*>""",
+            re.IGNORECASE | re.DOTALL
+        )
+
+    def extract(self, page: str) -> List[Tuple[str, str]]:
+        results = []
+        for anchor in self.anchor_pattern.finditer(page):
+            attributes, content = anchor.groups()
+            href = self.HREF_PATTERN.search(attributes)
+            if href is None:
+                continue
+            title = html.unescape(self.TAG_PATTERN.sub("", content))
+            results.append((title, html.unescape(href.group(1) or href.group(2) or "")))
+        return results
+
+
+class LxmlExtractor(ResultExtractor):
+    def __init__(self, link_class: str = "result__a", xpath: Optional[str] = None):
+        super().__init__(link_class)
+        self.xpath: Final[str] = xpath or f"//a[contains(concat(' ', normalize-space(@class), ' '), ' {link_class} ')]"
+
+    def extract(self, page: str) -> List[Tuple[str, str]]:
+        if not page.strip():
+            return []
+        document = lxml.html.fromstring(page)
+        return [(anchor.text_content(), anchor.get("href")) for anchor in document.xpath(self.xpath)]
+
+
+class SoupExtractor(ResultExtractor):
+    """
+    Parses the page with BeautifulSoup, only building the tree of the result anchors when strained.
+    A CSS selector can be used instead of the class for markup where the anchors don't have one (never strained).
+    """
+
+    def __init__(self, link_class: str = "result__a", strained: bool = True, parser: str = "html.parser",
+                 selector: Optional[str] = None):
+        super().__init__(link_class)
+        self.strained: Final[bool] = strained and selector is None
+        self.parser: Final[str] = parser
+        self.selector: Final[Optional[str]] = selector
+
+    def extract(self, page: str) -> List[Tuple[str, str]]:
+        if self.strained:
+            soup = BeautifulSoup(page, self.parser, parse_only=SoupStrainer("a", class_=self.link_class))
+        else:
+            soup = BeautifulSoup(page, self.parser)
+
+        anchors = soup.select(self.selector) if self.selector else soup.find_all("a", class_=self.link_class)
+        return [(anchor.get_text(), anchor.get("href")) for anchor in anchors]
+
+
+class ChainedExtractor(ResultExtractor):
+    """
+    Tries extractors in order until one finds results, so a broken fast path (markup changed) falls back to parsing.
+    """
+
+    def __init__(self, extractors: Sequence[ResultExtractor]):
+        super().__init__(extractors[0].link_class)
+        self.extractors: Final[Sequence[ResultExtractor]] = extractors
+
+    def extract(self, page: str) -> List[Tuple[str, str]]:
+        for extractor in self.extractors:
+            results = extractor.extract(page)
+            if results:
+                return results
+        return []
+
+
+def default_extractor(link_class: str = "result__a") -> ResultExtractor:
+    """
+    Gets the fastest extractor available: the regex fast path, falling back to lxml (or strained soup without it).
+
+    :param link_class: The class of the result anchors.
+    :return: The extractor.
+    """
+    fallback: Optional[ResultExtractor] = LxmlExtractor(link_class) if lxml is not None else None
+    return ChainedExtractor([RegexExtractor(link_class), fallback or SoupExtractor(link_class)])
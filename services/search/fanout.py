@@ -0,0 +1,126 @@
+import base64
+import binascii
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Final, List, Optional, Sequence, Set, Tuple
+
+from . import SearchResult
+from .web import WebSearcher
+
+
+def unwrap_url(href: str) -> str:
+    """
+    Gets the URL a result actually points to, unwrapping the redirects engines put around them
+    (DDG's /l/?uddg=, Bing's /ck/a?u=).
+
+    :param href: The href of a result.
+    :return: The URL of the result.
+    """
+    url = urllib.parse.urlsplit(href if not href.startswith("//") else f"https:{href}")
+    params = urllib.parse.parse_qs(url.query)
+
+    if url.netloc.endswith("duckduckgo.com") and url.path.startswith("/l/") and "uddg" in params:
+        return unwrap_url(params["uddg"][0])
+
+    if url.netloc.endswith("bing.com") and url.path.startswith("/ck/") and params.get("u", [""])[0].startswith("a1"):
+        encoded = params["u"][0][2:]
+        try:
+            return unwrap_url(base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode("utf-8"))
+        except (binascii.Error, UnicodeDecodeError):
+            pass
+
+    return urllib.parse.urlunsplit(url)
+
+
+def canonical_url(href: str) -> str:
+    """
+    Gets a form of the URL of a result that's comparable between engines: unwrapped, the host lowercased without
+    'www.' and fragments, tracking parameters and trailing slashes dropped.
+
+    :param href: The href of a result.
+    :return: The canonical URL.
+    """
+    url = urllib.parse.urlsplit(unwrap_url(href))
+    host = url.netloc.lower().removeprefix("www.")
+    query = urllib.parse.urlencode(
+        [(key, value) for key, value in urllib.parse.parse_qsl(url.query, keep_blank_values=True)
+         if not key.startswith("utm_")]
+    )
+    return urllib.parse.urlunsplit((url.scheme.lower(), host, url.path.rstrip("/"), query, ""))
+
+
+class FanOutSearcher:
+    """
+    Queries multiple engines at once and merges their results. Engines that haven't answered by the deadline are left
+    out (they keep running in the background, so their results are cached for the next time).
+    Merged results aren't cached, the engines cache their own (and are managed as caches of their own).
+    Rankings are fused with reciprocal rank fusion: a result scores sum(1 / (k + rank)) over the engines that found it.
+    """
+    RRF_K: Final[int] = 60
+
+    def __init__(self, engines: Sequence[WebSearcher], deadline: float = 3.0):
+        self.engines: Final[Sequence[WebSearcher]] = engines
+        self.enabled: Set[str] = {engine.name for engine in engines}
+        self.deadline: float = deadline
+        self.executor: Final[ThreadPoolExecutor] = ThreadPoolExecutor(max_workers=len(engines),
+                                                                      thread_name_prefix="search")
+
+    def search(self, query: str) -> List[SearchResult]:
+        """
+        Searches all enabled engines concurrently.
+
+        :param query: The query.
+        :return: The merged results, best first.
+        """
+        futures: Dict[Future, WebSearcher] = {
+            self.executor.submit(engine.search, query): engine
+            for engine in self.engines if engine.name in self.enabled
+        }
+        if not futures:
+            return []
+
+        done, _ = wait(futures, timeout=self.deadline)
+
+        rankings = []
+        errors = []
+        for future in done:
+            try:
+                rankings.append(future.result())
+            except Exception as e:
+                errors.append(f"{futures[future].name}: {e}")
+
+        if not rankings and errors:
+            raise Exception(f"Error: Unable to retrieve search results ({', '.join(errors)})")
+        return self.fuse(rankings)
+
+    def fuse(self, rankings: List[List[SearchResult]]) -> List[SearchResult]:
+        """
+        Merges the rankings of multiple engines, results that point to the same URL are merged as well.
+
+        :param rankings: The results of every engine, best first.
+        :return: The fused results, best first.
+        """
+        fused: Dict[str, Tuple[float, int, SearchResult]] = {}
+        for results in rankings:
+            seen: Set[str] = set()
+            for rank, result in enumerate(results, start=1):
+                url = canonical_url(result.location)
+                if url in seen:
+                    continue
+                seen.add(url)
+
+                score, best_rank, merged = fused.get(url, (0.0, rank, None))
+                if merged is None or rank < best_rank:
+                    # the title of the engine that ranked it highest wins
+                    merged = SearchResult(result.title, unwrap_url(result.location))
+                    best_rank = rank
+                fused[url] = (score + 1 / (self.RRF_K + rank), best_rank, merged)
+
+        merged_results = sorted(fused.values(), key=lambda entry: (-entry[0], entry[1]))
+        for ranking, (score, _, result) in enumerate(merged_results, start=1):
+            result.ranking = ranking
+            result.score = score
+        return [result for _, _, result in merged_results]
+
+    def engine(self, name: str) -> Optional[WebSearcher]:
+        return next((engine for engine in self.engines if engine.name == name), None)
@@ -0,0 +1,238 @@
+import os
+import pickle
+import threading
+import time
+from typing import Callable, Dict, Final, Iterator, List, Optional, Tuple
+
+import xxhash
+
+from etc.utils import FuzzyMatcher, TrigramIndex
+from .walker import ParallelWalker
+from ..internal.store import write_atomic
+
+
+class IndexedFile:
+    __slots__ = ("name", "extension", "size", "mtime")
+
+    def __init__(self, name: str, extension: str, size: int, mtime: float):
+        self.name = name
+        self.extension = extension
+        self.size = size
+        self.mtime = mtime
+
+    def __getstate__(self):
+        return self.name, self.extension, self.size, self.mtime
+
+    def __setstate__(self, state):
+        self.name, self.extension, self.size, self.mtime = state
+
+
+class IndexedDirectory:
+    __slots__ = ("signature", "files", "subdirectories")
+
+    def __init__(self, signature: Tuple[int, int], files: List[IndexedFile], subdirectories: List[str]):
+        self.signature = signature
+        self.files = files
+        self.subdirectories = subdirectories
+
+    def __getstate__(self):
+        return self.signature, self.files, self.subdirectories
+
+    def __setstate__(self, state):
+        self.signature, self.files, self.subdirectories = state
+
+
+class IndexColumns:
+    """
+    Flat, columnar view of an index, with the filenames normalized up front so they can be scored in batches.
+    """
+    PREFILTER_MIN_CANDIDATES: Final[int] = 50_000
+
+    def __init__(self, index: "FileIndex"):
+        self.directories: List[str] = []
+        self.files: List[IndexedFile] = []
+        for directory, file in index.entries():
+            self.directories.append(directory)
+            self.files.append(file)
+
+        self.normalized_names: List[str] = [FuzzyMatcher.normalize(file.name) for file in self.files]
+        self.__trigrams: Optional[TrigramIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    @property
+    def trigrams(self) -> Optional[TrigramIndex]:
+        # only worth building (once) for big indexes
+        if self.__trigrams is None and len(self) >= self.PREFILTER_MIN_CANDIDATES:
+            self.__trigrams = TrigramIndex(self.normalized_names)
+        return self.__trigrams
+
+
+class FileIndex:
+    """
+    Persistent filename index of everything below a root directory, think `locate`.
+    Refreshing only re-lists the directories whose mtime/ctime changed since the last refresh.
+    """
+
+    def __init__(self, root: str, index_dir: str):
+        self.root: Final[str] = os.path.abspath(root)
+        root_hash = xxhash.xxh64(self.root.encode("utf-8")).hexdigest()
+        self.index_file: Final[str] = os.path.join(index_dir, f"{root_hash}.index")
+        self.directories: Dict[str, IndexedDirectory] = {}
+        self.last_refreshed: float = 0.0
+        self.is_dirty: bool = False
+        self.__columns: Optional[IndexColumns] = None
+
+    def __len__(self) -> int:
+        return sum(len(directory.files) for directory in self.directories.values())
+
+    @staticmethod
+    def signature_of(stat: os.stat_result) -> Tuple[int, int]:
+        return stat.st_mtime_ns, stat.st_ctime_ns
+
+    @staticmethod
+    def scan(directory: str, signature: Tuple[int, int]) -> IndexedDirectory:
+        """
+        Lists a single directory (no recursion).
+
+        :param directory: The directory to list.
+        :param signature: The signature of the directory at the time it's being listed.
+        :return: The indexed directory.
+        """
+        files = []
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            files.append(IndexedFile(entry.name, os.path.splitext(entry.name)[1].lower(),
+                                                     stat.st_size, stat.st_mtime))
+                    except OSError:
+                        continue
+        except OSError:
+            # no permission, vanished, ...
+            pass
+        return IndexedDirectory(signature, files, subdirectories)
+
+    def refresh_directory(self, directory: str) -> Optional[IndexedDirectory]:
+        """
+        Brings the index entry of a single directory up-to-date, only re-listing it when it changed.
+
+        :param directory: The directory to refresh.
+        :return: The (refreshed) indexed directory, or None if it doesn't exist anymore.
+        """
+        try:
+            signature = self.signature_of(os.stat(directory))
+        except OSError:
+            return None
+
+        indexed = self.directories.get(directory)
+        if indexed is None or indexed.signature != signature:
+            indexed = self.scan(directory, signature)
+            self.is_dirty = True
+        return indexed
+
+    def refresh(self, walker: Optional[ParallelWalker] = None, stop_event: Optional[threading.Event] = None,
+                on_directory: Optional[Callable[[str, IndexedDirectory], None]] = None) -> bool:
+        """
+        Brings the whole index up-to-date. Unchanged directories only cost a single stat.
+
+        :param walker: The walker that walks the tree (in parallel), decides on depth & exclusions as well.
+        :param stop_event: Stops the refresh early, the directories that were visited until then are still updated.
+        :param on_directory: Gets called (on a worker) with every directory as soon as it's been refreshed.
+        :return: If the refresh completed (wasn't stopped).
+        """
+        walker = walker or ParallelWalker()
+        refreshed: Dict[str, IndexedDirectory] = {}
+
+        def visit(directory: str) -> Optional[List[str]]:
+            indexed = self.refresh_directory(directory)
+            if indexed is None:
+                return None
+
+            refreshed[directory] = indexed
+            if on_directory is not None:
+                on_directory(directory, indexed)
+            return indexed.subdirectories
+
+        walker.walk(self.root, visit, stop_event=stop_event)
+        completed = stop_event is None or not stop_event.is_set()
+
+        changed = any(indexed is not self.directories.get(directory) for directory, indexed in refreshed.items())
+        if completed:
+            changed = changed or refreshed.keys() != self.directories.keys()
+        else:
+            # only part of the tree was visited, keep what we knew about the rest
+            refreshed = {**self.directories, **refreshed}
+
+        if changed:
+            self.is_dirty = True
+            self.__columns = None
+
+        self.directories = refreshed
+        if completed:
+            self.last_refreshed = time.time()
+        return completed
+
+    def columns(self) -> IndexColumns:
+        """
+        Gets the columnar view of the index, it's rebuilt only when the index changed.
+
+        :return: The columns of the index.
+        """
+        if self.__columns is None:
+            self.__columns = IndexColumns(self)
+        return self.__columns
+
+    def entries(self) -> Iterator[Tuple[str, IndexedFile]]:
+        """
+        Iterates over every indexed file.
+
+        :return: An iterator of (directory, file) tuples.
+        """
+        for directory, indexed in self.directories.items():
+            for file in indexed.files:
+                yield directory, file
+
+    def save(self) -> None:
+        """
+        Saves the index to a file (if it changed).
+        """
+        if not self.is_dirty:
+            return
+
+        write_atomic(self.index_file, {"root": self.root, "directories": self.directories})
+        self.is_dirty = False
+
+    def delete(self) -> None:
+        """
+        Drops the index, in memory as well as its file. It gets rebuilt on its next refresh.
+        """
+        self.directories = {}
+        self.last_refreshed = 0.0
+        self.is_dirty = False
+        self.__columns = None
+        if os.path.exists(self.index_file):
+            os.remove(self.index_file)
+
+    def load(self) -> bool:
+        """
+        Loads the index from a file.
+        """
+        if not os.path.exists(self.index_file):
+            return False
+
+        with open(file=self.index_file, mode="rb") as f:
+            index_data = pickle.load(f)
+        if index_data.get("root") != self.root:
+            # hash collision, ignore
+            return False
+
+        self.directories = index_data.get("directories", {})
+        self.__columns = None
+        return True
@@ -1,38 +1,284 @@
+import heapq
 import os
+import threading
+import time
 from abc import ABCMeta
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List
+from collections import OrderedDict
+from datetime import timedelta
+from queue import Queue, Empty
+from typing import List, Dict, Final, Optional, Iterator, Tuple, Callable, Sequence
 
-from fuzzywuzzy import fuzz
+from etc.utils import FuzzyMatcher, TrigramIndex
 
+from ..internal.store import CacheStore
 from . import SearchResult, Searcher
+from .content import ContentMatch, ContentQuery, ContentScanner
+from .index import FileIndex, IndexedDirectory, IndexedFile, IndexColumns
+from .walker import ParallelWalker
 
 
 class LocalSearcher(Searcher, metaclass=ABCMeta):
-    def __init__(self, cache_dir: str):
-        super().__init__(cache_dir, "search", authority="LOCAL")
+    REFRESH_INTERVAL: Final[timedelta] = timedelta(seconds=30)
+    COLUMN_CHUNK_SIZE: Final[int] = 65_536
+    PERFECT_SCORE: Final[int] = 100
+    INDEXED_FILE_SIZE_ESTIMATE: Final[int] = 150
+    MAX_INDEX_FILES: Final[int] = 32
 
-    def search(self, directories: List[str], fn_query: str, file_types: str = "", search_threshold: int = 50) -> \
-            List[SearchResult]:
-        matches = []
+    def __init__(self, cache_dir: str, store: Optional[CacheStore] = None):
+        super().__init__(cache_dir, "search", authority="LOCAL", store=store)
+        self.index_dir: Final[str] = os.path.join(cache_dir, "index")
+        # root -> index, ordered from least to most recently used
+        self.indexes: OrderedDict[str, FileIndex] = OrderedDict()
+        self.__indexes_lock: threading.Lock = threading.Lock()
+        self.walker: ParallelWalker = ParallelWalker()
+        self.max_results: Optional[int] = None
+        self.perfect_score: float = self.PERFECT_SCORE
+        self.content_scanner: ContentScanner = ContentScanner()
 
-        with ThreadPoolExecutor() as executor:
-            futures = {
-                executor.submit(self.__search_directory, directory, fn_query, file_types, search_threshold):
-                    directory for directory in directories
-            }
-            for future in as_completed(futures):
-                matches.extend(future.result())
+    def get_index(self, root: str, refresh: bool = True) -> FileIndex:
+        """
+        Gets the filename index of a root directory, building it on first use.
 
-        return matches
+        :param root: The root directory.
+        :param refresh: Refreshes the index first when it hasn't been refreshed recently.
+        :return: The index of the root directory.
+        """
+        root = os.path.abspath(root)
+        with self.__indexes_lock:
+            index = self.indexes.get(root)
+            if index is None:
+                index = FileIndex(root, self.index_dir)
+                index.load()
+                self.indexes[root] = index
+            self.indexes.move_to_end(root)
+
+        if refresh and not self.is_fresh(index):
+            index.refresh(self.walker)
+        return index
+
+    def is_fresh(self, index: FileIndex) -> bool:
+        return time.time() - index.last_refreshed <= self.REFRESH_INTERVAL.total_seconds()
+
+    def search(self, directories: List[str], fn_query: str, file_types: str = "", search_threshold: int = 50,
+               top_k: Optional[int] = None) -> List[SearchResult]:
+        """
+        Searches the filename indexes of the given directories, results are ranked from best to worst.
+
+        :param directories: The root directories to search in.
+        :param fn_query: The (fuzzy) filename query, an empty query matches everything.
+        :param file_types: Space-separated file extensions to filter on (e.g. ".mp4 .mkv"), empty allows every type.
+        :param search_threshold: The minimum matching score of a filename.
+        :param top_k: Only keeps the K best matches. Candidates that can't beat the K-th best score are skipped and
+                      the search stops early once K matches reached the perfect score.
+        :return: The matching files.
+        """
+        if top_k is None:
+            matches = sorted(self.search_iter(directories, fn_query, file_types, search_threshold),
+                             key=lambda match: -match.score)
+        else:
+            matches = self.__search_top_k(directories, fn_query, file_types, search_threshold, top_k)
 
-    def __search_directory(self, directory: str, query: str, file_types: str, search_threshold: int) -> \
-            List[SearchResult]:
-        matches = []
-        for root, _, filenames in os.walk(directory):
-            for filename in filenames:
-                if filename.endswith(tuple(ft for ft in file_types)) or (file_types and file_types[0] == ""):
-                    if fuzz.token_sort_ratio(query.lower(), filename.lower()) > search_threshold or query == "":
-                        match = SearchResult(filename, os.path.join(root, filename))
-                        matches.append(match)
+        for ranking, match in enumerate(matches, start=1):
+            match.ranking = ranking
         return matches
+
+    def __search_top_k(self, directories: List[str], fn_query: str, file_types: str, search_threshold: int,
+                       top_k: int) -> List[SearchResult]:
+        heap: List[Tuple[float, int, SearchResult]] = []  # min-heap, so the K-th best is always on top
+        kth_score = [float(search_threshold)]  # read by the workers, so it's only ever swapped as a whole
+        stop_event = threading.Event()
+
+        matches = self.__iter_matches(directories, fn_query, file_types, lambda: kth_score[0], stop_event)
+        for order, match in enumerate(matches):
+            if len(heap) < top_k:
+                heapq.heappush(heap, (match.score, -order, match))
+            elif match.score > heap[0][0]:
+                heapq.heapreplace(heap, (match.score, -order, match))
+            else:
+                continue
+
+            if len(heap) >= top_k:
+                kth_score[0] = heap[0][0]
+                if kth_score[0] >= self.perfect_score:
+                    # can't get any better than this
+                    stop_event.set()
+                    break
+
+        # best first, earlier finds win ties
+        return [match for _, _, match in sorted(heap, reverse=True)]
+
+    def search_iter(self, directories: List[str], fn_query: str, file_types: str = "", search_threshold: int = 50,
+                    stop_event: Optional[threading.Event] = None) -> Iterator[SearchResult]:
+        """
+        Same as search, but yields (unranked) matches as soon as they are found. When an index needs refreshing, every
+        directory gets matched right after the walker refreshed it, instead of after the whole tree has been walked.
+
+        :param directories: The root directories to search in.
+        :param fn_query: The (fuzzy) filename query, an empty query matches everything.
+        :param file_types: Space-separated file extensions to filter on (e.g. ".mp4 .mkv"), empty allows every type.
+        :param search_threshold: The minimum matching score of a filename.
+        :param stop_event: Stops the search (and the walk) as soon as it is set.
+        :return: An iterator over the matching files.
+        """
+        stop_event = stop_event or threading.Event()
+        for found, match in enumerate(self.__iter_matches(directories, fn_query, file_types,
+                                                          lambda: search_threshold, stop_event), start=1):
+            yield match
+            if self.max_results and found >= self.max_results:
+                stop_event.set()
+                return
+
+    def __iter_matches(self, directories: List[str], query: str, file_types: str, min_score: Callable[[], float],
+                       stop_event: threading.Event) -> Iterator[SearchResult]:
+        extensions = tuple(ext.lower() for ext in file_types.split())
+
+        try:
+            for directory in directories:
+                index = self.get_index(directory, refresh=False)
+                if self.is_fresh(index):
+                    batches = self.__match_columns(index.columns(), query, extensions, min_score)
+                else:
+                    batches = self.__match_while_refreshing(index, query, extensions, min_score, stop_event)
+
+                for batch in batches:
+                    for match in batch:
+                        if stop_event.is_set():
+                            return
+                        yield match
+        finally:
+            # also stops the walk when the caller stops consuming early
+            stop_event.set()
+
+    def __match_columns(self, columns: IndexColumns, query: str, extensions: Tuple[str, ...],
+                        min_score: Callable[[], float]) -> Iterator[List[SearchResult]]:
+        # chunked, so a rising minimum score (top-k) prunes the remaining chunks and results come in early
+        for start in range(0, len(columns), self.COLUMN_CHUNK_SIZE):
+            candidates = range(start, min(start + self.COLUMN_CHUNK_SIZE, len(columns)))
+            yield self.__match(query, columns.directories, columns.files, columns.normalized_names, candidates,
+                               extensions, min_score(), columns.trigrams)
+
+    def __match_while_refreshing(self, index: FileIndex, query: str, extensions: Tuple[str, ...],
+                                 min_score: Callable[[], float],
+                                 stop_event: threading.Event) -> Iterator[List[SearchResult]]:
+        found: Queue[List[SearchResult]] = Queue()
+
+        def on_directory(directory: str, indexed: IndexedDirectory) -> None:
+            normalized_names = [FuzzyMatcher.normalize(file.name) for file in indexed.files]
+            batch = self.__match(query, [directory] * len(indexed.files), indexed.files, normalized_names,
+                                 range(len(indexed.files)), extensions, min_score())
+            if batch:
+                found.put(batch)
+
+        refresher = threading.Thread(target=index.refresh, args=(self.walker, stop_event, on_directory), daemon=True)
+        refresher.start()
+
+        try:
+            while refresher.is_alive() or not found.empty():
+                try:
+                    yield found.get(timeout=0.05)
+                except Empty:
+                    continue
+        finally:
+            # stopped early, give the walk a moment to wind down instead of leaving it behind
+            stop_event.set()
+            refresher.join(timeout=1.0)
+
+    @staticmethod
+    def __match(query: str, directories: List[str], files: List[IndexedFile], normalized_names: List[str],
+                candidates: Sequence[int], extensions: Tuple[str, ...], min_score: float,
+                trigrams: Optional[TrigramIndex] = None) -> List[SearchResult]:
+        if extensions:
+            candidates = [i for i in candidates if files[i].extension in extensions]
+
+        if query == "":
+            scores = [(i, 100.0) for i in candidates]
+        else:
+            scores = FuzzyMatcher.score_batch(query, normalized_names, min_score, indices=candidates,
+                                              trigrams=trigrams)
+            scores = [(i, score) for i, score in scores if score > min_score]
+
+        return [
+            SearchResult(files[i].name, os.path.join(directories[i], files[i].name), score=score)
+            for i, score in scores
+        ]
+
+    def search_content(self, directories: List[str], query: ContentQuery, file_types: str = "",
+                       max_file_size: Optional[int] = None,
+                       stop_event: Optional[threading.Event] = None) -> Iterator[ContentMatch]:
+        """
+        Greps the contents of the files below the given directories, yielding matching lines as soon as they are found.
+        The files (and their sizes) come from the filename indexes, so filtering doesn't cost a stat per file.
+
+        :param directories: The root directories to search in.
+        :param query: What to look for.
+        :param file_types: Space-separated file extensions to filter on (e.g. ".py .txt"), empty allows every type.
+        :param max_file_size: Skips files bigger than this (in bytes).
+        :param stop_event: Stops the search as soon as it is set.
+        :return: An iterator over the matching lines.
+        """
+        stop_event = stop_event or threading.Event()
+        extensions = tuple(ext.lower() for ext in file_types.split())
+
+        def candidates() -> Iterator[Tuple[str, int]]:
+            for directory in directories:
+                for parent, file in self.get_index(directory).entries():
+                    if stop_event.is_set():
+                        return
+                    if extensions and file.extension not in extensions:
+                        continue
+                    if max_file_size is not None and file.size > max_file_size:
+                        continue
+                    yield os.path.join(parent, file.name), file.size
+
+        try:
+            for found, match in enumerate(self.content_scanner.scan(candidates(), query, stop_event), start=1):
+                yield match
+                if self.max_results and found >= self.max_results:
+                    return
+        finally:
+            stop_event.set()
+
+    # the indexes count towards the cache, results get evicted first. evicted indexes are deleted (files included),
+    # they're rebuilt on their next use
+    def entry_count(self) -> int:
+        return super().entry_count() + sum(len(index) for index in list(self.indexes.values()))
+
+    def memory_size(self) -> int:
+        return super().memory_size() + self.__index_memory_size()
+
+    def __index_memory_size(self) -> int:
+        return sum(len(index) for index in list(self.indexes.values())) * self.INDEXED_FILE_SIZE_ESTIMATE
+
+    def evict(self, max_memory: int) -> int:
+        evicted = super().evict(max(0, max_memory - self.__index_memory_size()))
+        with self.__indexes_lock:
+            # always keep the most recent index, even if it's huge on its own
+            while len(self.indexes) > 1 and self.memory_size() > max_memory:
+                _, index = self.indexes.popitem(last=False)
+                evicted += len(index)
+                index.delete()
+        return evicted
+
+    def disk_size(self) -> int:
+        return super().disk_size() + self.file_size(*self.__index_files())
+
+    def __index_files(self) -> List[str]:
+        if not os.path.isdir(self.index_dir):
+            return []
+        return [os.path.join(self.index_dir, file) for file in os.listdir(self.index_dir)]
+
+    def has_changes(self) -> bool:
+        return super().has_changes() or any(index.is_dirty for index in list(self.indexes.values()))
+
+    def save(self) -> None:
+        for index in list(self.indexes.values()):
+            index.save()
+        self.__prune_index_files()
+        super().save()
+
+    def __prune_index_files(self) -> None:
+        # the index files of roots that weren't used for a while (not even loaded) would pile up otherwise
+        in_use = {index.index_file for index in list(self.indexes.values())}
+        unused = sorted((file for file in self.__index_files() if file not in in_use), key=os.path.getmtime)
+        for index_file in unused[:max(0, len(unused) + len(in_use) - self.MAX_INDEX_FILES)]:
+            os.remove(index_file)
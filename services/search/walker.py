@@ -0,0 +1,58 @@
+import fnmatch
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class ParallelWalker:
+    """
+    Walks a directory tree on a thread pool. Every directory is its own task, so subdirectories found by one worker
+    get picked up by whichever worker is free next (instead of one worker per root doing all the work).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_depth: Optional[int] = None,
+                 exclude: Iterable[str] = ()):
+        # scandir/stat release the GIL, so more threads than cores still pays off on slow disks and network shares
+        self.max_workers: int = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.max_depth: Optional[int] = max_depth
+        self.exclude: List[str] = list(exclude)
+
+    def is_excluded(self, directory: str) -> bool:
+        """
+        Checks whether a directory matches any of the exclusion globs (on its name or on its full path).
+
+        :param directory: The directory.
+        :return: If the directory should be skipped.
+        """
+        name = os.path.basename(directory)
+        return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(directory, pattern) for pattern in self.exclude)
+
+    def walk(self, root: str, visit: Callable[[str], Optional[List[str]]],
+             stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Walks the tree below (and including) a root directory.
+
+        :param root: The directory to start at.
+        :param visit: Gets called (on a worker) for every directory, returns the subdirectories to descend into.
+        :param stop_event: Stops the walk as soon as it is set; directories that are already being visited finish.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending: Dict[Future, int] = {executor.submit(visit, root): 0}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = pending.pop(future)
+                    subdirectories = future.result()
+
+                    if stop_event is not None and stop_event.is_set():
+                        for remaining in pending:
+                            remaining.cancel()
+                        return
+
+                    if not subdirectories or (self.max_depth is not None and depth >= self.max_depth):
+                        continue
+
+                    for subdirectory in subdirectories:
+                        if not self.is_excluded(subdirectory):
+                            pending[executor.submit(visit, subdirectory)] = depth + 1
@@ -1,60 +1,141 @@
-from abc import abstractmethod, ABC, ABCMeta
-from typing import List, Final, Dict
-
-import requests
-from bs4 import BeautifulSoup
+import threading
+import urllib.parse
+from abc import ABCMeta
+from typing import List, Final, Dict, Optional, Set
 
 from . import SearchResult, Searcher
+from .cache import ResultCache
+from .extract import ResultExtractor, RegexExtractor, LxmlExtractor, SoupExtractor, ChainedExtractor, \
+    default_extractor, lxml
+from ..inet.http import HttpClient
+from ..internal.store import CacheStore
 
 
 class WebSearcher(Searcher, metaclass=ABCMeta):
     QUERY_PLACEHOLDER: Final[str] = "<SEARCH_QUERY>"
 
-    def __init__(self, cache_dir: str, query_url: str, authority: str = "WEB"):
-        super().__init__(cache_dir, "search", authority=authority)
+    def __init__(self, cache_dir: str, query_url: str, authority: str = "WEB", http: Optional[HttpClient] = None,
+                 extractor: Optional[ResultExtractor] = None, store: Optional[CacheStore] = None):
+        super().__init__(cache_dir, "search", authority=authority, store=store)
+        self.authority: Final[str] = authority
         self.headers: Final[Dict[str, str]] = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
         self.query_url: Final[str] = query_url
+        self.http: HttpClient = http or HttpClient()
+        self.extractor: ResultExtractor = extractor or default_extractor()
+        self.__revalidating: Set[str] = set()
+        self.__revalidating_lock = threading.Lock()
 
-    @abstractmethod
-    def search(self, query: str) -> List[SearchResult]:
-        pass
+    @property
+    def name(self) -> str:
+        return self.authority.lower()
 
     def querify(self, search_query: str) -> str:
-        search_query = search_query.strip().replace(" ", "+")
+        search_query = urllib.parse.quote_plus(search_query.strip())
         query_url = self.query_url.replace(self.QUERY_PLACEHOLDER, search_query)
         return query_url
 
+    def search(self, query: str) -> List[SearchResult]:
+        # fresh results are served from the cache, stale ones too while they're being revalidated in the background
+        entry, freshness = self.results_cache.get(query)
+        if entry is not None:
+            if freshness == ResultCache.STALE:
+                self.revalidate_deferred(query)
+            return entry.results
 
-class DuckDuckGoSearcher(WebSearcher, metaclass=ABCMeta):
-    def __init__(self, cache_dir: str, query_url: str):
-        super().__init__(cache_dir, query_url, authority="DDG")
+        return self.fetch(query)
 
-    def search(self, query: str) -> List[SearchResult]:
-        # check if data is available in cache
-        if query in self.results_cache:
-            return self.results_cache[query]
+    def revalidate_deferred(self, query: str) -> None:
+        """
+        Revalidates the cached results of a query on a background thread, at most once at a time per query.
 
+        :param query: The query.
+        """
+        key = ResultCache.normalize(query)
+        with self.__revalidating_lock:
+            if key in self.__revalidating:
+                return
+            self.__revalidating.add(key)
+
+        def revalidate():
+            try:
+                self.fetch(query)
+            except Exception:
+                # the stale results will do for now
+                pass
+            finally:
+                with self.__revalidating_lock:
+                    self.__revalidating.discard(key)
+
+        threading.Thread(target=revalidate, daemon=True).start()
+
+    def fetch(self, query: str) -> List[SearchResult]:
+        """
+        Fetches the results of a query and caches them. A conditional request is made when results are cached already,
+        if the page didn't change those are kept.
+
+        :param query: The query.
+        :return: The results.
+        """
         # construct queried url
         search_url = self.querify(query)
 
+        headers = dict(self.headers)
+        entry, _ = self.results_cache.get(query, count=False)
+        if entry is not None:
+            headers.update(entry.validators)
+
         # do request
-        response = requests.get(search_url, headers=self.headers)
+        response = self.http.get(search_url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.results_cache.touch(query)
+            return entry.results
         if response.status_code != 200:
             raise Exception(f"Error: Unable to retrieve search results (status code: {response.status_code})")
 
         # parse web data
-        soup = BeautifulSoup(response.text, "html.parser")
-        web_results = soup.find_all("a", class_="result__a")
-
-        search_results = []
-        for index, result in enumerate(web_results, start=1):
-            title = result.get_text()
-            href = result.get("href")
-            search_result = SearchResult(title, href, ranking=index)
-            search_results.append(search_result)
+        search_results = [
+            SearchResult(title, href, ranking=index)
+            for index, (title, href) in enumerate(self.extractor.extract(response.text), start=1)
+        ]
 
         # save results to cache & return
-        self.results_cache[query] = search_results
+        self.results_cache.put(query, search_results, validators=self.validators_of(response))
         return search_results
+
+    @staticmethod
+    def validators_of(response) -> Dict[str, str]:
+        validators = {}
+        if "ETag" in response.headers:
+            validators["If-None-Match"] = response.headers["ETag"]
+        if "Last-Modified" in response.headers:
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        return validators
+
+
+class DuckDuckGoSearcher(WebSearcher, metaclass=ABCMeta):
+    def __init__(self, cache_dir: str, query_url: str, http: Optional[HttpClient] = None,
+                 extractor: Optional[ResultExtractor] = None, store: Optional[CacheStore] = None):
+        super().__init__(cache_dir, query_url, authority="DDG", http=http, extractor=extractor, store=store)
+
+
+class BingSearcher(WebSearcher, metaclass=ABCMeta):
+    # result anchors don't have a class of their own, they're the heading of a 'b_algo' list item
+    ANCHOR_PATTERN: Final[str] = r"""<li\s[^>]*\bclass\s*=\s*["']b_algo\b[^>]*>.*?<h2[^>]*>\s*<a\s([^>]*)>(.*?)</a\s*>"""
+    XPATH: Final[str] = "//li[contains(concat(' ', normalize-space(@class), ' '), ' b_algo ')]//h2/a"
+    SELECTOR: Final[str] = "li.b_algo h2 a"
+
+    def __init__(self, cache_dir: str, query_url: str, http: Optional[HttpClient] = None,
+                 extractor: Optional[ResultExtractor] = None, store: Optional[CacheStore] = None):
+        if extractor is None:
+            fallback = LxmlExtractor(xpath=self.XPATH) if lxml is not None else SoupExtractor(selector=self.SELECTOR)
+            extractor = ChainedExtractor([RegexExtractor(anchor_pattern=self.ANCHOR_PATTERN), fallback])
+        super().__init__(cache_dir, query_url, authority="BING", http=http, extractor=extractor, store=store)
+
+
+class MojeekSearcher(WebSearcher, metaclass=ABCMeta):
+    def __init__(self, cache_dir: str, query_url: str, http: Optional[HttpClient] = None,
+                 extractor: Optional[ResultExtractor] = None, store: Optional[CacheStore] = None):
+        super().__init__(cache_dir, query_url, authority="MOJEEK", http=http,
+                         extractor=extractor or default_extractor(link_class="title"), store=store)